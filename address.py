@@ -0,0 +1,98 @@
+"""Normalização de endereços para a geocodificação, com regex pré-compilada e memoização
+
+Todas as abreviações viram uma única regex de alternativas, e um mapa decide o que fazer
+com cada uma: tipos de logradouro (Av., R., Al., Pça.) são sempre expandidos, e títulos
+(Dr., Min., Prof....) são expandidos na primeira tentativa ou removidos na segunda.
+Os resultados ficam num LRU limitado, já que os mesmos endereços voltam a cada execução.
+"""
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+ADDRESS_CACHE_SIZE = int(os.getenv("ADDRESS_CACHE_SIZE", 4096))  # Endereços memorizados por variante
+
+# Abreviação (minúscula, sem ponto) -> (expansão, removível na segunda tentativa)
+ABBREVIATIONS = {
+    "av": ("Avenida", False),
+    "r": ("Rua", False),
+    "al": ("Alameda", False),
+    "pça": ("Praça", False),
+    "pca": ("Praça", False),
+    "min": ("Ministro", True),
+    "des": ("Desembargador", True),
+    "sra": ("Senhora", True),
+    "dr": ("Doutor", True),
+    "pres": ("Presidente", True),
+    "brig": ("Brigadeiro", True),
+    "eng": ("Engenheiro", True),
+    "prof": ("Professor", True),
+}
+
+# Alternativas mais longas primeiro, consumindo o ponto e os espaços seguintes
+ABBREVIATION = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, ABBREVIATIONS), key=len, reverse=True)) + r")(?:\.|\b)\s*",
+    re.IGNORECASE
+)
+AFTER_NUMBER = re.compile(r"(\d+).*")  # Remove após números
+POSTAL_CODE = re.compile(r",?\s*\d{5}-?\d{3}.*")  # Remove CEP
+LANDMARK = re.compile(r"\b(pr[óo]ximo|altura|alt|perto|ao lado)\b.*", re.IGNORECASE)
+AFTER_COMMA = re.compile(r",.*?(?=\s*\d|$)")  # Remove após vírgula
+SPACES = re.compile(r"\s{2,}")
+NOT_WORD = re.compile(r"[^\w]+")
+
+
+def expand(match):
+    return ABBREVIATIONS[match.group(1).lower()][0] + " "
+
+
+def expand_or_remove(match):
+    expansion, removable = ABBREVIATIONS[match.group(1).lower()]
+    return "" if removable else expansion + " "
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def clean_address(address, try_with_prefixes=True):
+    """Limpa e simplifica o endereço para geocodificação
+
+    Na primeira tentativa as abreviações são expandidas; na segunda (try_with_prefixes=False)
+    os títulos são removidos por completo.
+    """
+    if not address or address == "N/A":
+        return None
+
+    address = ABBREVIATION.sub(expand if try_with_prefixes else expand_or_remove, address)
+
+    # Limpeza comum para ambos os casos
+    simplified = AFTER_NUMBER.sub(r"\1", address)
+    simplified = POSTAL_CODE.sub("", simplified)
+    simplified = LANDMARK.sub("", simplified)
+    simplified = AFTER_COMMA.sub("", simplified)
+    simplified = SPACES.sub(" ", simplified).strip().strip(",")
+
+    return simplified if simplified else None
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def canonical_key(address):
+    """Chave canônica do endereço (cache de geocodificação, deduplicação), ou None se inválido
+
+    Parte do endereço limpo com as abreviações expandidas e tira acentos, pontuação e
+    diferenças de caixa: "Av. Brig. Faria Lima, 2232" e "AVENIDA BRIGADEIRO FARIA LIMA 2232"
+    dão a mesma chave.
+    """
+    cleaned = clean_address(address, try_with_prefixes=True)
+    return normalize_key(cleaned) if cleaned else None
+
+
+def normalize_key(text):
+    """Tira acentos, pontuação e diferenças de caixa, ou None se não sobrar nada"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    unaccented = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return NOT_WORD.sub(" ", unaccented).strip().casefold() or None
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def street_key(name):
+    """Chave de um nome de logradouro (ex: do OpenStreetMap), com as abreviações expandidas"""
+    return normalize_key(ABBREVIATION.sub(expand, name))
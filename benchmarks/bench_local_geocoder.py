@@ -0,0 +1,98 @@
+"""Custo da geocodificação pelo índice local do OpenStreetMap, num extrato sintético
+
+Gera um extrato XML com ruas retas e números a cada 10 metros (metade em nós, metade em
+prédios), monta o índice e mede as consultas: números exatos, interpolados e ruas
+inexistentes. Para comparação, a Nominatim pública aceita 1 consulta por segundo.
+Uso: python benchmarks/bench_local_geocoder.py [ruas] [consultas]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+from osm_geocoder import LocalGeocoder, build_index  # noqa: E402
+
+STREET_TYPES = ["Rua", "Avenida", "Alameda", "Praça"]
+NUMBERS = range(10, 3000, 20)  # Números mapeados em cada rua (os ímpares ficam para interpolar)
+SYLLABLES = ["ba", "ce", "di", "fo", "gu", "la", "me", "ni", "po", "ru", "sa", "te", "vi", "xo", "zu"]
+
+
+def street_name(s):
+    """Nome sem dígitos (o clean_address corta tudo depois do primeiro número)"""
+    word = ""
+    while True:
+        s, digit = divmod(s, len(SYLLABLES))
+        word += SYLLABLES[digit]
+        if not s:
+            break
+    return f"{STREET_TYPES[len(word) % len(STREET_TYPES)]} {word.capitalize()}"
+
+
+def write_extract(path, streets):
+    """Extrato sintético: cada rua sai de um ponto aleatório e os números crescem para leste"""
+    rng = random.Random(42)
+    node_id = way_id = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<osm version="0.6">\n')
+        ways = []
+        for s in range(streets):
+            name = street_name(s)
+            lat, lon = rng.uniform(-23.75, -23.40), rng.uniform(-46.85, -46.60)
+            for number in NUMBERS:
+                node_lon = lon + number * 1e-5
+                if number % 40 == 10:
+                    node_id += 1
+                    f.write(f'<node id="{node_id}" lat="{lat:.7f}" lon="{node_lon:.7f}">'
+                            f'<tag k="addr:street" v="{name}"/><tag k="addr:housenumber" v="{number}"/></node>\n')
+                else:
+                    corners = []
+                    for dlat, dlon in ((0, -3e-5), (0, 3e-5), (6e-5, 3e-5), (6e-5, -3e-5)):
+                        node_id += 1
+                        corners.append(node_id)
+                        f.write(f'<node id="{node_id}" lat="{lat + dlat:.7f}" lon="{node_lon + dlon:.7f}"/>\n')
+                    ways.append((corners, name, number))
+        for corners, name, number in ways:
+            way_id += 1
+            refs = "".join(f'<nd ref="{ref}"/>' for ref in corners + corners[:1])
+            f.write(f'<way id="{way_id}">{refs}<tag k="building" v="yes"/>'
+                    f'<tag k="addr:street" v="{name}"/><tag k="addr:housenumber" v="{number}"/></way>\n')
+        f.write("</osm>\n")
+
+
+def main():
+    streets = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    folder = tempfile.mkdtemp()
+    extract, index = os.path.join(folder, "sintetico.osm"), os.path.join(folder, "osm_geocoder.sqlite")
+    write_extract(extract, streets)
+
+    start = time.perf_counter()
+    street_count, point_count = build_index(extract, index)
+    build_time = time.perf_counter() - start
+    print(f"Índice: {street_count} logradouros, {point_count} números, montado em {build_time:.1f} s "
+          f"({os.path.getsize(index) / 1024 / 1024:.1f} MB)")
+
+    rng = random.Random(7)
+    geocoder = LocalGeocoder(index)
+    cases = {
+        "exatos": [f"{street_name(s)}, {rng.choice(NUMBERS)}"
+                   for s in (rng.randrange(streets) for _ in range(count))],
+        "interpolados": [f"{street_name(s)}, {rng.choice(NUMBERS) + 1}"
+                         for s in (rng.randrange(streets) for _ in range(count))],
+        "inexistentes": [f"Rua Inexistente {street_name(s)}, 100" for s in range(count)],
+    }
+    for label, addresses in cases.items():
+        start = time.perf_counter()
+        found = sum(1 for address in addresses if geocoder.geocode(address))
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<13} {elapsed / count * 1e6:7.1f} µs/consulta, {found}/{count} resolvidos")
+    print(f"  {count} endereços pela Nominatim pública levariam ~{count / 3600:.1f} h (1 consulta/s)")
+    geocoder.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Compara a busca linear de estação mais próxima com o índice espacial em grade,
+com a grade pré-calculada (station_grid) e com o kernel vetorizado (NumPy) em lote
+
+Uso: python benchmarks/bench_nearest_station.py [número de estações sintéticas]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from station_index import StationIndex, haversine_distance  # noqa: E402
+from station_grid import StationGrid, build_grid  # noqa: E402
+from station_table import StationTable  # noqa: E402
+import distance_matrix  # noqa: E402
+
+# Caixa aproximada da Grande São Paulo
+LAT_RANGE = (-23.75, -23.40)
+LON_RANGE = (-46.85, -46.40)
+QUERIES = 2000
+
+
+def linear_nearest(stations, lat, lon):
+    """Busca linear, como find_nearest_station fazia antes do índice"""
+    nearest = min(stations, key=lambda s: haversine_distance(lat, lon, s["lat"], s["lon"]))
+    return haversine_distance(lat, lon, nearest["lat"], nearest["lon"]), nearest
+
+
+def load_real_stations():
+    import csv
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "estacoes.csv")
+    with open(path, encoding="utf-8") as f:
+        return [{"linha": r["Linha"], "nome": r["Nome da Estacao"],
+                 "lat": float(r["Latitude"]), "lon": float(r["Longitude"])}
+                for r in csv.DictReader(f)]
+
+
+def synthetic_stations(n, rng):
+    return [{"linha": "sintetica", "nome": f"Parada {i}",
+             "lat": rng.uniform(*LAT_RANGE), "lon": rng.uniform(*LON_RANGE)}
+            for i in range(n)]
+
+
+def bench(label, stations, queries):
+    start = time.perf_counter()
+    expected = [linear_nearest(stations, lat, lon) for lat, lon in queries]
+    linear_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = StationIndex(StationTable(stations))
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = [index.nearest(lat, lon)[0] for lat, lon in queries]
+    index_time = time.perf_counter() - start
+
+    grid_path = os.path.join(tempfile.mkdtemp(), "station_grid.bin")
+    start = time.perf_counter()
+    build_grid(index.stations, grid_path, bytes(32))
+    grid = StationGrid(grid_path, index.stations)
+    grid_build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Pontos fora da grade (ou em células OVERFLOW) caem no índice, como em find_nearest_station
+    gridded = [grid.nearest(lat, lon) or index.nearest(lat, lon)[0] for lat, lon in queries]
+    grid_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, bulk = distance_matrix.top_k(
+        [lat for lat, _ in queries], [lon for _, lon in queries],
+        [s["lat"] for s in stations], [s["lon"] for s in stations]
+    )
+    bulk_time = time.perf_counter() - start
+
+    mismatches = sum(1 for (d1, _), (d2, _) in zip(expected, found) if abs(d1 - d2) > 1e-6)
+    mismatches += sum(1 for (d1, _), (d2, _) in zip(expected, gridded) if abs(d1 - d2) > 1e-6)
+    mismatches += sum(1 for (d1, _), d2 in zip(expected, bulk[:, 0]) if abs(d1 - d2) > 1e-3)
+    print(f"{label}: {len(stations)} estações, {len(queries)} consultas")
+    print(f"  linear: {linear_time / len(queries) * 1e6:9.1f} µs/consulta")
+    print(f"  índice: {index_time / len(queries) * 1e6:9.1f} µs/consulta "
+          f"(montagem {build_time * 1000:.1f} ms, {linear_time / index_time:.1f}x mais rápido)")
+    print(f"  grade:  {grid_time / len(queries) * 1e6:9.1f} µs/consulta "
+          f"(montagem {grid_build_time * 1000:.1f} ms, {linear_time / grid_time:.1f}x mais rápido)")
+    print(f"  numpy:  {bulk_time / len(queries) * 1e6:9.1f} µs/consulta "
+          f"(em lote, {linear_time / bulk_time:.1f}x mais rápido)")
+    print(f"  divergências: {mismatches}")
+
+
+def main():
+    rng = random.Random(42)
+    synthetic = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    queries = [(rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for _ in range(QUERIES)]
+
+    bench("estacoes.csv", load_real_stations(), queries)
+    bench("sintético", synthetic_stations(synthetic, rng), queries)
+
+
+if __name__ == "__main__":
+    main()
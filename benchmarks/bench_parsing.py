@@ -0,0 +1,54 @@
+"""Compara o parsing com BeautifulSoup (html.parser) e com o extrator direto em lxml
+
+Usa as páginas salvas em benchmarks/fixtures e confere que os dois backends extraem o mesmo.
+Uso: python benchmarks/bench_parsing.py [repetições]
+"""
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+import pega_os_duo  # noqa: E402
+
+FIXTURES = os.path.join(BENCH_DIR, "fixtures")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def timed(function, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function(html)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def compare(label, function, html, repeat):
+    results = {}
+    for backend in ("html.parser", "lxml"):
+        pega_os_duo.HTML_PARSER = backend
+        results[backend] = timed(function, html, repeat)
+
+    (soup_time, soup_result), (lxml_time, lxml_result) = results["html.parser"], results["lxml"]
+    print(f"{label} ({len(html) / 1024:.0f} KB, {repeat} repetições)")
+    print(f"  html.parser: {soup_time * 1000:8.2f} ms/página")
+    print(f"  lxml:        {lxml_time * 1000:8.2f} ms/página ({soup_time / lxml_time:.1f}x mais rápido)")
+    print(f"  resultados iguais: {'sim' if soup_result == lxml_result else 'NÃO'}")
+
+
+def main():
+    if not pega_os_duo.page_parser.available():
+        print("❌ lxml não está instalado")
+        return
+
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    compare("Página de restaurante", pega_os_duo.parse_restaurant_page, read_fixture("restaurante.html"), repeat)
+    compare("Listagem", pega_os_duo.parse_listing, read_fixture("listagem.html"), max(1, repeat // 5))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Custo por consulta da distância até as estações: dicionários + map(radians) x StationTable
+
+Mede também quanto custa carregar as estações lendo o CSV e lendo o snapshot (pickle).
+Uso: python benchmarks/bench_station_table.py [consultas]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+from station_grid import file_hash  # noqa: E402
+from station_index import haversine_distance  # noqa: E402
+from station_table import StationTable, read_stations_csv  # noqa: E402
+
+STATIONS_CSV = os.path.join(BENCH_DIR, "..", "estacoes.csv")
+LAT_RANGE = (-23.75, -23.40)
+LON_RANGE = (-46.85, -46.40)
+
+
+def dict_nearest(stations, lat, lon):
+    """Varredura com a lista de dicionários, como antes da StationTable"""
+    return min((haversine_distance(lat, lon, s["lat"], s["lon"]), i) for i, s in enumerate(stations))
+
+
+def timed(function, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(42)
+    queries = [(rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for _ in range(count)]
+
+    records = read_stations_csv(STATIONS_CSV)
+    table = StationTable(records)
+    everything = range(len(table))
+
+    dict_time, expected = timed(lambda: [dict_nearest(records, lat, lon) for lat, lon in queries])
+    table_time, found = timed(lambda: [table.nearest_of(everything, lat, lon) for lat, lon in queries])
+    mismatches = sum(1 for (d1, i1), (d2, i2) in zip(expected, found) if abs(d1 - d2) > 1e-6)
+
+    per_station = len(queries) * len(table)
+    print(f"{len(table)} estações, {len(queries)} consultas (varredura completa)")
+    print(f"  dicionários: {dict_time / len(queries) * 1e6:7.1f} µs/consulta "
+          f"({dict_time / per_station * 1e9:.0f} ns/estação)")
+    print(f"  StationTable: {table_time / len(queries) * 1e6:6.1f} µs/consulta "
+          f"({table_time / per_station * 1e9:.0f} ns/estação, {dict_time / table_time:.1f}x mais rápido)")
+    print(f"  divergências: {mismatches}")
+
+    snapshot = os.path.join(tempfile.mkdtemp(), "stations.pickle")
+    source_hash = file_hash(STATIONS_CSV)
+    table.save_snapshot(snapshot, source_hash)
+    csv_time, _ = timed(lambda: StationTable(read_stations_csv(STATIONS_CSV)), repeat=50)
+    snapshot_time, _ = timed(lambda: StationTable.load_snapshot(snapshot, source_hash), repeat=50)
+    print("Carga das estações")
+    print(f"  CSV:      {csv_time * 1000:6.2f} ms")
+    print(f"  snapshot: {snapshot_time * 1000:6.2f} ms ({csv_time / snapshot_time:.1f}x mais rápido)")
+
+
+if __name__ == "__main__":
+    main()
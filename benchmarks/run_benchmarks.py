@@ -0,0 +1,218 @@
+"""Suíte de benchmarks offline: execuções completas contra o servidor local e micro-benchmarks
+
+As execuções completas rodam o main() do pega_os_duo com 10, 100 e 1000 restaurantes
+servidos pelo stub_server (sem rede e sem cota de API), com latência artificial opcional.
+Os resultados vão para benchmarks/results/<data>.json e são comparados com os da
+execução anterior.
+
+Uso: python benchmarks/run_benchmarks.py [--sizes 10,100,1000] [--latency 0.02] [--micro-only]
+"""
+import argparse
+import contextlib
+import csv
+import glob
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+import diff  # noqa: E402
+import pega_os_duo  # noqa: E402
+from stub_server import StubServer, read_fixture  # noqa: E402
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+STATIONS_CSV = os.path.abspath(os.path.join(REPO_DIR, "estacoes.csv"))
+ADDRESSES = [
+    "Rua Treze de Maio, 1004 Bela Vista São Paulo",
+    "Av. Brig. Faria Lima, 2232 - Jardim Paulistano, 01451-000",
+    "Al. Min. Rocha Azevedo, 1052 próximo ao metrô Consolação",
+    "R. Dr. Melo Alves, 400, Cerqueira César",
+    "Av. Pres. Juscelino Kubitschek, 1830 Torre II",
+    "Rua Des. Eliseu Guilherme, 69 alt. do 200",
+]
+
+
+def per_call(function, repeat):
+    """Tempo médio por chamada, em microssegundos"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def clean_all():
+    return [pega_os_duo.clean_address(a, p) for a in ADDRESSES for p in (True, False)]
+
+
+def bench_clean_address(repeat=2000):
+    """Sem memoização: o LRU é esvaziado antes de cada rodada"""
+    def cold():
+        pega_os_duo.clean_address.cache_clear()
+        clean_all()
+    return per_call(cold, repeat) / (len(ADDRESSES) * 2)
+
+
+def bench_clean_address_cached(repeat=2000):
+    clean_all()
+    return per_call(clean_all, repeat) / (len(ADDRESSES) * 2)
+
+
+def bench_parse_calendar(repeat=500):
+    soup = BeautifulSoup(read_fixture("restaurante.html"), "html.parser")
+    return per_call(lambda: pega_os_duo.parse_calendar(soup), repeat)
+
+
+def bench_find_nearest_station(count=5000):
+    rng = random.Random(42)
+    points = [(rng.uniform(-23.75, -23.40), rng.uniform(-46.85, -46.40)) for _ in range(count)]
+    pega_os_duo.find_nearest_station(*points[0])  # Monta índice e grade fora da medição
+    start = time.perf_counter()
+    for lat, lon in points:
+        pega_os_duo.find_nearest_station(lat, lon)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def write_sample_csv(path, rows, fieldnames):
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def bench_diff(count=20000):
+    """Compara duas versões sintéticas do CSV (1% modificado, 0,5% removido e adicionado)"""
+    fieldnames = pega_os_duo.DEFAULT_FIELDNAMES
+    old = [{**{field: "" for field in fieldnames}, "nome": f"Restaurante {i}", "link": f"/r/{i}",
+            "Estacao": "Sé", "Linha": "1-Azul", "Distancia": str(300 + i % 900), "Tempo": "5.0",
+            "almoco_seg": "X"} for i in range(count)]
+    new = [dict(row) for row in old[count // 200:]]
+    new += [{**old[0], "nome": f"Novo {i}", "link": f"/novo/{i}"} for i in range(count // 200)]
+    for row in new[::100]:
+        row["cozinha"] = "Japonesa"
+    with tempfile.TemporaryDirectory() as folder:
+        old_path, new_path = os.path.join(folder, "antigo.csv"), os.path.join(folder, "novo.csv")
+        write_sample_csv(old_path, old, fieldnames)
+        write_sample_csv(new_path, new, fieldnames)
+        start = time.perf_counter()
+        diff.resumir_mudancas(diff.comparar_arquivos(old_path, new_path))
+        return (time.perf_counter() - start) * 1000
+
+
+def run_end_to_end(restaurants, latency):
+    """Roda o main() completo contra o servidor local numa pasta temporária"""
+    server = StubServer(restaurants, latency)
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        try:
+            server.configure(pega_os_duo)
+            pega_os_duo.STATIONS_CSV = STATIONS_CSV
+            pega_os_duo.MAX_RESTAURANTS = restaurants
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                pega_os_duo.main()
+            elapsed = time.perf_counter() - start
+            with open(pega_os_duo.PROFILE, encoding="utf-8") as f:
+                profile = json.load(f)
+        finally:
+            os.chdir(previous_dir)
+            server.close()
+    return {
+        "seconds": elapsed,
+        "per_restaurant_ms": elapsed / restaurants * 1000,
+        "requests": dict(server.requests),
+        "stages": {name: entry["total"] for name, entry in profile["stages"].items()},
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_results():
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")))
+    if not files:
+        return None
+    with open(files[-1], encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(label, value, previous, unit):
+    """Linha do relatório com a variação em relação à execução anterior"""
+    line = f"  {label:<28} {value:10.2f} {unit}"
+    if previous:
+        line += f"  ({(value / previous - 1) * 100:+.1f}% vs anterior)"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000", help="Restaurantes por execução completa")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latência artificial por requisição (s)")
+    parser.add_argument("--micro-only", action="store_true", help="Só os micro-benchmarks")
+    args = parser.parse_args()
+
+    pega_os_duo.STATIONS_CSV = STATIONS_CSV
+    previous = previous_results() or {}
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "latency": args.latency,
+        "micro": {},
+        "end_to_end": {},
+    }
+
+    print("🔬 Micro-benchmarks")
+    micro = [
+        ("clean_address", bench_clean_address, "µs"),
+        ("clean_address (memoizado)", bench_clean_address_cached, "µs"),
+        ("parse_calendar", bench_parse_calendar, "µs"),
+        ("find_nearest_station", bench_find_nearest_station, "µs"),
+        ("diff.comparar_arquivos", bench_diff, "ms"),
+    ]
+    with tempfile.TemporaryDirectory() as folder, contextlib.redirect_stdout(io.StringIO()):
+        # Grade e snapshot das estações ficam na pasta temporária
+        previous_dir = os.getcwd()
+        os.chdir(folder)
+        try:
+            for name, function, _ in micro:
+                results["micro"][name] = function()
+        finally:
+            os.chdir(previous_dir)
+    for name, _, unit in micro:
+        print(compare(name, results["micro"][name], previous.get("micro", {}).get(name), unit))
+
+    if not args.micro_only:
+        print(f"\n🏁 Execuções completas (latência artificial: {args.latency * 1000:.0f} ms)")
+        for size in (int(s) for s in args.sizes.split(",")):
+            result = run_end_to_end(size, args.latency)
+            results["end_to_end"][str(size)] = result
+            earlier = previous.get("end_to_end", {}).get(str(size), {})
+            print(compare(f"{size} restaurantes", result["seconds"], earlier.get("seconds"), "s"))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Resultados salvos em {os.path.relpath(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Servidor HTTP local que imita o Duo Gourmet, a Nominatim e a Routes API a partir das fixtures
+
+A listagem e as páginas de restaurante saem de benchmarks/fixtures (com nomes, links e
+endereços trocados para cada restaurante), e a Nominatim e a Routes respondem com as
+respostas gravadas em nominatim.json e routes.json. Cada requisição pode ganhar uma
+latência artificial, por serviço, para simular a rede.
+
+Uso avulso: python benchmarks/stub_server.py [restaurantes] [latência em segundos]
+"""
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+LIST_PATH = "/restaurantes/sao-paulo"
+PAGE_SIZE = 24  # Restaurantes por página da listagem
+CARD = re.compile(r'<div class="col-md-4"><div class="restaurant-card card">.*?</div></div></div>', re.DOTALL)
+STREETS = ["Rua Augusta", "Av. Paulista", "Rua Treze de Maio", "Al. Santos", "Rua Oscar Freire",
+           "Av. Brig. Faria Lima", "Rua Haddock Lobo", "Av. Dr. Arnaldo", "Rua Pamplona", "Av. Rebouças"]
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class Fixtures:
+    """Modelos de página e respostas gravadas, carregados uma vez"""
+
+    def __init__(self):
+        listing = read_fixture("listagem.html")
+        cards = list(CARD.finditer(listing))
+        self.listing_head = listing[:cards[0].start()]
+        self.listing_tail = listing[cards[-1].end():]
+        self.card = cards[0].group(0).replace("bistro-bela-0", "{slug}").replace("Bistrô Bela 0", "{name}")
+        self.restaurant = (read_fixture("restaurante.html")
+                           .replace("Trattoria do Bixiga", "{name}")
+                           .replace("Rua Treze de Maio, 1004", "{address}"))
+        self.nominatim = json.loads(read_fixture("nominatim.json"))
+        self.route = json.loads(read_fixture("routes.json"))[0]
+
+    def listing_page(self, page, total):
+        start = (page - 1) * PAGE_SIZE
+        cards = "".join(self.card.replace("{slug}", f"restaurante-{i}").replace("{name}", f"Restaurante {i:05d}")
+                        for i in range(start, min(start + PAGE_SIZE, total)))
+        next_link = f'<a rel="next" href="{LIST_PATH}?page={page + 1}">Próxima</a>' if start + PAGE_SIZE < total else ""
+        return self.listing_head + cards + next_link + self.listing_tail
+
+    def restaurant_page(self, i):
+        address = f"{STREETS[i % len(STREETS)]}, {100 + i * 7 % 3000}"
+        return self.restaurant.replace("{name}", f"Restaurante {i:05d}").replace("{address}", address)
+
+    def nominatim_response(self, query):
+        """Resposta gravada com as coordenadas deslocadas de forma determinística pela consulta"""
+        rng = random.Random(zlib.crc32(query.encode("utf-8")))
+        place = dict(self.nominatim[0])
+        place["lat"] = f"{float(place['lat']) + rng.uniform(-0.08, 0.08):.7f}"
+        place["lon"] = f"{float(place['lon']) + rng.uniform(-0.08, 0.08):.7f}"
+        return [place]
+
+    def routes_response(self, request):
+        elements = []
+        for o, origin in enumerate(request["origins"]):
+            for d, _ in enumerate(request["destinations"]):
+                seed = zlib.crc32(json.dumps(origin, sort_keys=True).encode("utf-8")) + d
+                factor = 1 + (seed % 40) / 100
+                distance = int(self.route["distanceMeters"] * factor)
+                duration = int(float(self.route["duration"].rstrip("s")) * factor)
+                elements.append({**self.route, "originIndex": o, "destinationIndex": d,
+                                 "distanceMeters": distance, "duration": f"{duration}s"})
+        return elements
+
+
+class StubServer:
+    """Sobe o servidor numa thread; latency é um número ou {"duo", "nominatim", "routes"} em segundos"""
+
+    def __init__(self, restaurants=100, latency=0.0, port=0):
+        self.restaurants = restaurants
+        self.latency = latency if isinstance(latency, dict) else {"duo": latency, "nominatim": latency, "routes": latency}
+        self.requests = {"duo": 0, "nominatim": 0, "routes": 0}
+        self.lock = threading.Lock()
+        self.fixtures = Fixtures()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self.handler())
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def hit(self, service):
+        with self.lock:
+            self.requests[service] += 1
+        if self.latency.get(service):
+            time.sleep(self.latency[service])
+
+    def handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, body, content_type="text/html; charset=utf-8", status=200):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == "/search":
+                    server.hit("nominatim")
+                    self.send(json.dumps(server.fixtures.nominatim_response(query.get("q", [""])[0])),
+                              "application/json")
+                elif url.path.rstrip("/") == LIST_PATH:
+                    server.hit("duo")
+                    page = int(query.get("page", ["1"])[0])
+                    self.send(server.fixtures.listing_page(page, server.restaurants))
+                elif url.path.startswith(LIST_PATH + "/restaurante-"):
+                    server.hit("duo")
+                    self.send(server.fixtures.restaurant_page(int(url.path.rsplit("-", 1)[1])))
+                else:
+                    self.send("", status=404)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.hit("routes")
+                self.send(json.dumps(server.fixtures.routes_response(request)), "application/json")
+
+        return Handler
+
+    def configure(self, module):
+        """Aponta as URLs do pega_os_duo para o servidor local"""
+        module.BASE_URL = self.base_url
+        module.LIST_URL = self.base_url + LIST_PATH
+        module.NOMINATIM_URL = self.base_url + "/search"
+        module.ROUTES_URL = self.base_url + "/routes"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    server = StubServer(int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+                        float(sys.argv[2]) if len(sys.argv) > 2 else 0.0, port=8765)
+    print(f"🧪 Servidor local em {server.base_url} (listagem em {server.base_url}{LIST_PATH})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.close()
@@ -0,0 +1,153 @@
+"""Roda o pega_os_duo.py para várias cidades em paralelo, um processo por cidade
+
+Cada cidade grava tudo (CSV, caches, diário, grade de estações) na sua própria pasta em
+CITIES_OUTPUT_DIR, e no final os CSVs são juntados em um único arquivo com a coluna "cidade".
+Uso: CITIES=sao-paulo,rio-de-janeiro python cities.py
+"""
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+import pega_os_duo
+from http_client import configure_limiter
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Configuração por cidade: listagem no Duo, nome (normalização e geocodificação), estações e distância máxima
+CITIES = {
+    "sao-paulo": {
+        "name": "São Paulo",
+        "list_url": f"{pega_os_duo.BASE_URL}/restaurantes/sao-paulo",
+        "geocode_region": "São Paulo, Brasil",
+        "stations_csv": "estacoes.csv",
+        "max_distance": 2000,
+    },
+    "rio-de-janeiro": {
+        "name": "Rio de Janeiro",
+        "list_url": f"{pega_os_duo.BASE_URL}/restaurantes/rio-de-janeiro",
+        "geocode_region": "Rio de Janeiro, Brasil",
+        "stations_csv": "estacoes_rio-de-janeiro.csv",
+        "max_distance": 2000,
+    },
+    "belo-horizonte": {
+        "name": "Belo Horizonte",
+        "list_url": f"{pega_os_duo.BASE_URL}/restaurantes/belo-horizonte",
+        "geocode_region": "Belo Horizonte, Minas Gerais, Brasil",
+        "stations_csv": "estacoes_belo-horizonte.csv",
+        "max_distance": 1500,
+    },
+    "porto-alegre": {
+        "name": "Porto Alegre",
+        "list_url": f"{pega_os_duo.BASE_URL}/restaurantes/porto-alegre",
+        "geocode_region": "Porto Alegre, Rio Grande do Sul, Brasil",
+        "stations_csv": "estacoes_porto-alegre.csv",
+        "max_distance": 1500,
+    },
+}
+
+SELECTED_CITIES = [c.strip() for c in os.getenv("CITIES", ",".join(CITIES)).split(",") if c.strip()]
+CITIES_OUTPUT_DIR = os.getenv("CITIES_OUTPUT_DIR", "cidades")  # Uma subpasta por cidade
+CITY_PROCESSES = int(os.getenv("CITY_PROCESSES", 4))  # Cidades processadas ao mesmo tempo
+MERGED_CSV = os.getenv("MERGED_CSV", "restaurantes_todas_cidades.csv")
+
+current_city = None  # Cidade configurada neste processo
+
+
+def stations_path(city):
+    return os.path.join(REPO_DIR, city["stations_csv"])
+
+
+def configure_city(slug, output_dir, processes):
+    """Aponta o pega_os_duo para a cidade e para a pasta dela (no processo atual)
+
+    As estações só são recarregadas quando o processo troca de cidade. Os limitadores
+    ficam isolados em cada processo, mas Duo e Nominatim são os mesmos para todas as
+    cidades: o intervalo deles é multiplicado pelo número de processos para manter a
+    taxa total (a Nominatim pede no máximo 1 requisição por segundo).
+    """
+    global current_city
+    city = CITIES[slug]
+    pega_os_duo.LIST_URL = city["list_url"]
+    pega_os_duo.CITY_NAME = city["name"]
+    pega_os_duo.GEOCODE_REGION = city["geocode_region"]
+    pega_os_duo.STATIONS_CSV = stations_path(city)
+    # A variável de ambiente MAX_DISTANCE, se definida, vale para todas as cidades
+    pega_os_duo.MAX_DISTANCE = int(os.getenv("MAX_DISTANCE", city["max_distance"]))
+
+    if current_city != slug:
+        pega_os_duo.stations_cache = None
+        pega_os_duo.stations_index = None
+        pega_os_duo.stations_grid = None
+        current_city = slug
+
+    configure_limiter(urlparse(pega_os_duo.BASE_URL).hostname, pega_os_duo.REQUESTS_DELAY * processes)
+    configure_limiter(urlparse(pega_os_duo.NOMINATIM_URL).hostname, pega_os_duo.NOMINATIM_DELAY * processes)
+
+    city_dir = os.path.join(output_dir, slug)
+    os.makedirs(city_dir, exist_ok=True)
+    os.chdir(city_dir)
+    return city_dir
+
+
+def run_city(slug, output_dir, processes):
+    """Processa uma cidade (em um processo do pool) e devolve o caminho do CSV dela, ou None"""
+    try:
+        city_dir = configure_city(slug, output_dir, processes)
+        print(f"🏙️ Iniciando {CITIES[slug]['name']}...")
+        pega_os_duo.main()
+        csv_path = os.path.join(city_dir, pega_os_duo.CSV_FILE)
+        return csv_path if os.path.exists(csv_path) else None
+    except Exception as e:
+        print(f"⚠️ Erro ao processar a cidade {slug}: {e}")
+        return None
+
+
+def merge_cities(csv_paths, merged_path):
+    """Junta os CSVs das cidades num único arquivo, com a coluna "cidade" na frente"""
+    fieldnames = ["cidade"]
+    rows = []
+    for slug, path in csv_paths:
+        with open(path, encoding="utf-8-sig") as csvfile:
+            reader = csv.DictReader(csvfile)
+            fieldnames += [field for field in reader.fieldnames if field not in fieldnames]
+            rows += [{"cidade": slug, **row} for row in reader]
+
+    temp_path = merged_path + ".tmp"
+    with open(temp_path, "w", newline="", encoding="utf-8-sig") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, restval="")
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(temp_path, merged_path)
+    return len(rows)
+
+
+def main():
+    cities = []
+    for slug in SELECTED_CITIES:
+        if slug not in CITIES:
+            print(f"⚠️ Cidade desconhecida: {slug}")
+        elif not os.path.exists(stations_path(CITIES[slug])):
+            print(f"⚠️ {CITIES[slug]['name']} ignorada: arquivo de estações {CITIES[slug]['stations_csv']} não encontrado")
+        else:
+            cities.append(slug)
+    if not cities:
+        print("❌ Nenhuma cidade para processar.")
+        return
+
+    output_dir = os.path.abspath(CITIES_OUTPUT_DIR)
+    processes = max(1, min(CITY_PROCESSES, len(cities)))
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        results = list(executor.map(run_city, cities, [output_dir] * len(cities), [processes] * len(cities)))
+
+    done = [(slug, path) for slug, path in zip(cities, results) if path]
+    for slug, path in zip(cities, results):
+        if not path:
+            print(f"⚠️ {CITIES[slug]['name']} não gerou CSV")
+    if done:
+        total = merge_cities(done, MERGED_CSV)
+        print(f"\n✅ {total} restaurantes de {len(done)} cidades juntados em {MERGED_CSV}")
+
+
+if __name__ == "__main__":
+    main()
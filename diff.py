@@ -1,11 +1,19 @@
 import csv
-from collections import defaultdict
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import zlib
 
 # Configuração - altere estes valores
 ARQUIVO_ANTIGO = 'restaurantes_com_metro_google_anterior.csv'
 ARQUIVO_NOVO = 'restaurantes_com_metro_google.csv'
 IGNORAR_DISTANCIA = 0.25  # 0.1 = 10% de variação
 MAX_DIFF = 10  # Limite de detalhes a serem mostrados (None para mostrar todos)
+ARQUIVO_FEED = 'mudancas.jsonl'  # Feed de mudanças em JSON Lines (None para não gerar)
+BYTES_POR_PARTICAO = 64 * 1024 * 1024  # Acima disso, os CSVs são divididos em partições no disco
 
 # Emojis para decorar a saída
 EMOJI_REMOVIDO = "❌"
@@ -21,18 +29,132 @@ CAMPOS_ALMOCO = ['almoco_dom', 'almoco_seg', 'almoco_ter', 'almoco_qua', 'almoco
 CAMPOS_JANTAR = ['jantar_dom', 'jantar_seg', 'jantar_ter', 'jantar_qua', 'jantar_qui', 'jantar_sex', 'jantar_sab']
 DIAS_SEMANA = ['Dom', 'Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sab']
 
+CAMPOS_HORARIOS = frozenset(CAMPOS_ALMOCO + CAMPOS_JANTAR)
+
 # Campos relacionados a metrô para tratamento especial
 CAMPOS_METRO = ['Linha', 'Estacao', 'Distancia', 'Tempo', 'Distancia_reta']
+CAMPOS_NUMERICOS = frozenset(['Distancia', 'Tempo', 'Distancia_reta'])
+
+def chave(row):
+    """Identifica o restaurante pelo link (nomes podem se repetir); CSVs antigos sem link usam o nome"""
+    return row.get('link') or row['nome']
+
+def ler_cabecalho(arquivo):
+    with open(arquivo, mode='r', encoding='utf-8-sig', newline='') as csvfile:
+        return [campo.strip() for campo in next(csv.reader(csvfile), [])]
+
+def ler_linhas(arquivo):
+    """Lê o CSV linha a linha, com campos e valores sem espaços nas pontas"""
+    with open(arquivo, mode='r', encoding='utf-8-sig', newline='') as csvfile:
+        for row in csv.DictReader(csvfile):
+            yield {k.strip(): v.strip() if isinstance(v, str) else v for k, v in row.items()}
+
+def hash_linha(row, campos):
+    """Hash do conteúdo da linha nas colunas comparadas (ausente conta como vazio)"""
+    conteudo = '\x1f'.join(row.get(campo) or '' for campo in campos)
+    return hashlib.blake2b(conteudo.encode('utf-8'), digest_size=16).digest()
+
+def particionar(arquivo, n_particoes, pasta, nome):
+    """Distribui as linhas do CSV em n_particoes arquivos pelo hash do link
+
+    Como o mesmo link sempre cai na mesma partição, cada par de partições (antiga, nova)
+    pode ser comparado sozinho, e só uma partição por vez fica em memória.
+    """
+    caminhos = [os.path.join(pasta, f"{nome}_{i}.csv") for i in range(n_particoes)]
+    arquivos = [open(caminho, 'w', encoding='utf-8', newline='') for caminho in caminhos]
+    try:
+        writers = None
+        for row in ler_linhas(arquivo):
+            if writers is None:
+                writers = [csv.DictWriter(f, fieldnames=list(row.keys())) for f in arquivos]
+                for writer in writers:
+                    writer.writeheader()
+            writers[zlib.crc32(chave(row).encode('utf-8')) % n_particoes].writerow(row)
+    finally:
+        for f in arquivos:
+            f.close()
+    return caminhos
+
+def pares_de_particoes(arquivo_antigo, arquivo_novo, pasta):
+    """Gera os pares (caminho antigo, caminho novo) a comparar, particionando se os arquivos forem grandes"""
+    tamanho = max(os.path.getsize(arquivo_antigo), os.path.getsize(arquivo_novo))
+    n_particoes = -(-tamanho // BYTES_POR_PARTICAO)
+    if n_particoes <= 1:
+        return [(arquivo_antigo, arquivo_novo)]
+    return list(zip(particionar(arquivo_antigo, n_particoes, pasta, 'antigo'),
+                    particionar(arquivo_novo, n_particoes, pasta, 'novo')))
+
+def campos_modificados(antigo, novo, campos, limite=IGNORAR_DISTANCIA):
+    """Campos que mudaram entre duas versões da linha, ignorando pequenas variações de distância"""
+    modificados = {}
+    for campo in campos:
+        valor_antigo = antigo.get(campo) or ''
+        valor_novo = novo.get(campo) or ''
+        if valor_antigo != valor_novo:
+            # Verifica se é uma mudança pequena que deve ser ignorada
+            if campo in CAMPOS_NUMERICOS and not deve_mostrar_mudanca(campo, valor_antigo, valor_novo, limite):
+                continue
+            modificados[campo] = {'antigo': valor_antigo, 'novo': valor_novo}
+    return modificados
+
+def comparar_colunas(arquivo_antigo, arquivo_novo):
+    """Colunas (adicionadas, removidas) entre as duas versões do CSV"""
+    colunas_antigas = set(ler_cabecalho(arquivo_antigo))
+    colunas_novas = set(ler_cabecalho(arquivo_novo))
+    return colunas_novas - colunas_antigas, colunas_antigas - colunas_novas
+
+def comparar_arquivos(arquivo_antigo, arquivo_novo, limite=IGNORAR_DISTANCIA):
+    """Compara duas versões do CSV pelo link, com memória limitada ao tamanho de uma partição
+
+    As linhas antigas da partição ficam num dicionário link -> (hash, linha); as novas
+    são lidas em stream. Só as linhas com hash diferente são comparadas campo a campo.
+    Gera as mudanças assim que cada uma é encontrada, partição a partição:
+    ('removido', link, linha), ('adicionado', link, linha) ou
+    ('modificado', link, {'antigo': linha, 'novo': linha, 'campos': {campo: {'antigo', 'novo'}}}).
+    """
+    campos = sorted(set(ler_cabecalho(arquivo_antigo)) | set(ler_cabecalho(arquivo_novo)))
+
+    with tempfile.TemporaryDirectory() as pasta:
+        for particao_antiga, particao_nova in pares_de_particoes(arquivo_antigo, arquivo_novo, pasta):
+            antigos = {chave(row): (hash_linha(row, campos), row) for row in ler_linhas(particao_antiga)}
+            for novo in ler_linhas(particao_nova):
+                link = chave(novo)
+                anterior = antigos.pop(link, None)
+                if anterior is None:
+                    yield 'adicionado', link, novo
+                    continue
+                hash_antigo, antigo = anterior
+                if hash_antigo == hash_linha(novo, campos):
+                    continue
+                mudancas = campos_modificados(antigo, novo, campos, limite)
+                if mudancas:
+                    yield 'modificado', link, {'antigo': antigo, 'novo': novo, 'campos': mudancas}
+            for link, (_, row) in antigos.items():
+                yield 'removido', link, row
 
-def ler_restaurantes(arquivo):
-    restaurantes = {}
-    with open(arquivo, mode='r', encoding='utf-8-sig') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            nome = row['nome']
-            dados = {k.strip(): v.strip() if isinstance(v, str) else v for k, v in row.items()}
-            restaurantes[nome] = dados
-    return restaurantes
+def resumir_mudancas(mudancas, escrever=None, limite=MAX_DIFF):
+    """Conta as mudanças e guarda só as limite primeiras de cada tipo, em ordem de nome
+
+    Retorna {op: (total, [(nome, link, dados)])}. Cada mudança também é repassada para
+    escrever(op, link, dados), se informado (ex: o feed), sem ficar em memória.
+    """
+    resumo = {op: [0, []] for op in ('removido', 'adicionado', 'modificado')}
+    for op, link, dados in mudancas:
+        if escrever:
+            escrever(op, link, dados)
+        contagem = resumo[op]
+        contagem[0] += 1
+        nome = (dados['novo'] if op == 'modificado' else dados).get('nome') or ''
+        primeiros = contagem[1]
+        primeiros.append((nome, link, dados))
+        # Ordena e corta de tempos em tempos: no máximo 2 * limite itens por tipo
+        if limite is not None and len(primeiros) > 2 * limite:
+            primeiros.sort(key=lambda item: item[:2])
+            del primeiros[limite:]
+    for contagem in resumo.values():
+        contagem[1].sort(key=lambda item: item[:2])
+        del contagem[1][limite:]
+    return {op: tuple(contagem) for op, contagem in resumo.items()}
 
 def formatar_horarios(dados):
     almoco = []
@@ -61,7 +183,7 @@ def formatar_campo_metro(campo, valor):
 
 def deve_mostrar_mudanca(campo, valor_antigo, valor_novo, limite=IGNORAR_DISTANCIA):
     try:
-        if campo in ['Distancia', 'Tempo', 'Distancia_reta']:
+        if campo in CAMPOS_NUMERICOS:
             antigo = float(valor_antigo)
             novo = float(valor_novo)
             if antigo == 0:  # Evitar divisão por zero
@@ -76,50 +198,93 @@ def deve_mostrar_mudanca(campo, valor_antigo, valor_novo, limite=IGNORAR_DISTANC
         pass
     return True  # Se não for numérico ou der erro, mostra a mudança
 
-def comparar_restaurantes(antigos, novos):
-    removidos = set(antigos.keys()) - set(novos.keys())
-    adicionados = set(novos.keys()) - set(antigos.keys())
-    modificados = defaultdict(dict)
-    
-    # Verificar diferenças nas colunas
-    colunas_antigas = set()
-    for restaurante in antigos.values():
-        colunas_antigas.update(restaurante.keys())
-    
-    colunas_novas = set()
-    for restaurante in novos.values():
-        colunas_novas.update(restaurante.keys())
-    
-    colunas_adicionadas = colunas_novas - colunas_antigas
-    colunas_removidas = colunas_antigas - colunas_novas
-    
-    for nome in set(antigos.keys()) & set(novos.keys()):
-        antigo = antigos[nome]
-        novo = novos[nome]
-        campos_modificados = {}
-        
-        for campo in set(antigo.keys()).union(set(novo.keys())):
-            valor_antigo = antigo.get(campo, '')
-            valor_novo = novo.get(campo, '')
-            
-            if valor_antigo != valor_novo:
-                # Verifica se é uma mudança pequena que deve ser ignorada
-                if campo in ['Distancia', 'Tempo', 'Distancia_reta'] and not deve_mostrar_mudanca(campo, valor_antigo, valor_novo):
-                    continue
-                campos_modificados[campo] = {'antigo': valor_antigo, 'novo': valor_novo}
-        
-        if campos_modificados:
-            modificados[nome] = campos_modificados
+def gravar_feed(arquivo, mudancas, colunas_novas, colunas_adicionadas, colunas_removidas):
+    """Grava as mudanças em JSON Lines, um registro por restaurante, sem o limite de MAX_DIFF
+
+    A primeira linha ("cabecalho") traz as colunas da versão nova e a tolerância usada nas
+    distâncias. Depois vêm "removido" (link e nome), "adicionado" (linha completa) e
+    "modificado" (só os campos alterados, com valor antigo e novo), na ordem em que as
+    partições são comparadas. Aplicado sobre o CSV anterior com aplicar_feed, reproduz o
+    novo (a menos das variações dentro da tolerância).
+
+    Os registros vão direto para um arquivo temporário enquanto as mudanças são geradas;
+    como o cabeçalho leva as contagens, ele é escrito no fim, antes do corpo copiado.
+    Retorna o resumo de resumir_mudancas.
+    """
+    temp = arquivo + '.tmp'
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as corpo:
+        def escrever(op, link, dados):
+            if op == 'removido':
+                registro = {'op': op, 'link': link, 'nome': dados.get('nome')}
+            elif op == 'adicionado':
+                registro = {'op': op, 'link': link, 'linha': dados}
+            else:
+                registro = {'op': op, 'link': link, 'nome': dados['novo'].get('nome'), 'campos': dados['campos']}
+            corpo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+        resumo = resumir_mudancas(mudancas, escrever)
+        corpo.seek(0)
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'op': 'cabecalho',
+                'colunas': colunas_novas,
+                'colunas_adicionadas': sorted(colunas_adicionadas),
+                'colunas_removidas': sorted(colunas_removidas),
+                'ignorar_distancia': IGNORAR_DISTANCIA,
+                'removidos': resumo['removido'][0],
+                'adicionados': resumo['adicionado'][0],
+                'modificados': resumo['modificado'][0]
+            }, ensure_ascii=False) + '\n')
+            shutil.copyfileobj(corpo, f)
+    os.replace(temp, arquivo)
+    return resumo
+
+def aplicar_feed(arquivo_antigo, arquivo_feed, arquivo_saida):
+    """Aplica o feed de mudanças sobre o CSV anterior e grava o resultado em arquivo_saida
+
+    O CSV anterior é lido em stream; só as mudanças ficam em memória. As linhas mantêm a
+    ordem do arquivo anterior e as adicionadas vão para o final.
+    """
+    colunas = None
+    removidos, modificados, adicionados = set(), {}, []
+    with open(arquivo_feed, encoding='utf-8') as f:
+        for linha in f:
+            registro = json.loads(linha)
+            if registro['op'] == 'cabecalho':
+                colunas = registro['colunas']
+            elif registro['op'] == 'removido':
+                removidos.add(registro['link'])
+            elif registro['op'] == 'adicionado':
+                adicionados.append(registro['linha'])
+            elif registro['op'] == 'modificado':
+                modificados[registro['link']] = {campo: valores['novo'] for campo, valores in registro['campos'].items()}
     
-    return removidos, adicionados, modificados, colunas_adicionadas, colunas_removidas
+    temp = arquivo_saida + '.tmp'
+    with open(temp, 'w', newline='', encoding='utf-8-sig') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=colunas, restval='', extrasaction='ignore')
+        writer.writeheader()
+        for row in ler_linhas(arquivo_antigo):
+            link = chave(row)
+            if link in removidos:
+                continue
+            writer.writerow({**row, **modificados.get(link, {})})
+        writer.writerows(adicionados)
+    os.replace(temp, arquivo_saida)
 
 def main():
     print(f"Novidades da release:")
     
     try:
-        antigos = ler_restaurantes(ARQUIVO_ANTIGO)
-        novos = ler_restaurantes(ARQUIVO_NOVO)
-        removidos, adicionados, modificados, colunas_adicionadas, colunas_removidas = comparar_restaurantes(antigos, novos)
+        colunas_adicionadas, colunas_removidas = comparar_colunas(ARQUIVO_ANTIGO, ARQUIVO_NOVO)
+        mudancas = comparar_arquivos(ARQUIVO_ANTIGO, ARQUIVO_NOVO)
+        if ARQUIVO_FEED:
+            resumo = gravar_feed(ARQUIVO_FEED, mudancas, ler_cabecalho(ARQUIVO_NOVO),
+                                 colunas_adicionadas, colunas_removidas)
+        else:
+            resumo = resumir_mudancas(mudancas)
+        total_removidos, removidos = resumo['removido']
+        total_adicionados, adicionados = resumo['adicionado']
+        total_modificados, modificados = resumo['modificado']
         
         # Mostrar diferenças nas colunas (sem limite)
         if colunas_adicionadas:
@@ -133,40 +298,35 @@ def main():
                 print(f"  - {coluna}")
         
         # Restaurantes removidos (com limite)
-        print(f"\n{EMOJI_REMOVIDO} {len(removidos)} Restaurantes removidos do Duo Gourmet:")
-        for i, nome in enumerate(sorted(removidos)):
-            if MAX_DIFF is not None and i >= MAX_DIFF:
-                print(f"  ... e mais {len(removidos) - MAX_DIFF} restaurantes removidos")
-                break
+        print(f"\n{EMOJI_REMOVIDO} {total_removidos} Restaurantes removidos do Duo Gourmet:")
+        for nome, _, _ in removidos:
             print(f"  - {nome}")
+        if total_removidos > len(removidos):
+            print(f"  ... e mais {total_removidos - len(removidos)} restaurantes removidos")
         
         # Restaurantes adicionados (com limite)
-        print(f"\n{EMOJI_ADICIONADO} {len(adicionados)} Restaurantes adicionados ao Duo Gourmet:")
-        for i, nome in enumerate(sorted(adicionados)):
-            if MAX_DIFF is not None and i >= MAX_DIFF:
-                print(f"  ... e mais {len(adicionados) - MAX_DIFF} restaurantes adicionados")
-                break
+        print(f"\n{EMOJI_ADICIONADO} {total_adicionados} Restaurantes adicionados ao Duo Gourmet:")
+        for nome, _, _ in adicionados:
             print(f"  - {nome}")
+        if total_adicionados > len(adicionados):
+            print(f"  ... e mais {total_adicionados - len(adicionados)} restaurantes adicionados")
         
         # Restaurantes modificados (com limite)
-        print(f"\n{EMOJI_MODIFICADO} {len(modificados)} Restaurantes modificados:")
-        for i, (nome, campos) in enumerate(sorted(modificados.items())):
-            if MAX_DIFF is not None and i >= MAX_DIFF:
-                print(f"\n... e mais {len(modificados) - MAX_DIFF} restaurantes modificados")
-                break
-            
+        print(f"\n{EMOJI_MODIFICADO} {total_modificados} Restaurantes modificados:")
+        for nome, _, mudanca in modificados:
+            campos = mudanca['campos']
             print(f"\n{EMOJI_MODIFICADO} {nome}:")
             
             # Verificar se há mudanças nos horários
-            tem_horarios_modificados = any(campo in CAMPOS_ALMOCO + CAMPOS_JANTAR for campo in campos.keys())
+            tem_horarios_modificados = any(campo in CAMPOS_HORARIOS for campo in campos)
             tem_metro_modificado = any(campo in CAMPOS_METRO for campo in campos.keys())
             
             # Mostrar horários se modificados
             if tem_horarios_modificados:
                 print("\n  🕒 Horários Antigos:")
-                print(f"  {formatar_horarios(antigos[nome])}")
+                print(f"  {formatar_horarios(mudanca['antigo'])}")
                 print("\n  🕒 Horários Novos:")
-                print(f"  {formatar_horarios(novos[nome])}")
+                print(f"  {formatar_horarios(mudanca['novo'])}")
             
             # Mostrar informações de metrô se modificadas
             if tem_metro_modificado:
@@ -178,7 +338,7 @@ def main():
             
             # Mostrar outros campos modificados
             outros_campos = {k: v for k, v in campos.items() 
-                           if k not in CAMPOS_ALMOCO + CAMPOS_JANTAR + CAMPOS_METRO}
+                           if k not in CAMPOS_HORARIOS and k not in CAMPOS_METRO}
             
             if outros_campos:
                 print("\n  📝 Outras modificações:")
@@ -186,6 +346,9 @@ def main():
                     print(f"  - Campo '{campo}':")
                     print(f"      Antigo: {valores['antigo']}")
                     print(f"      Novo:   {valores['novo']}")
+        
+        if total_modificados > len(modificados):
+            print(f"\n... e mais {total_modificados - len(modificados)} restaurantes modificados")
     
     except FileNotFoundError as e:
         print(f"❌ Erro: Arquivo não encontrado - {e.filename}")
@@ -193,4 +356,8 @@ def main():
         print(f"⚠️ Ocorreu um erro: {str(e)}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) == 5 and sys.argv[1] == "aplicar":
+        # python diff.py aplicar <csv anterior> <feed.jsonl> <csv de saída>
+        aplicar_feed(*sys.argv[2:])
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,72 @@
+import numpy as np
+
+EARTH_RADIUS = 6371000.0  # Raio da Terra em metros
+MAX_CHUNK_ELEMENTS = 2_000_000  # Elementos por bloco da matriz (~16 MB em float64)
+
+
+def to_radians(lats, lons):
+    """Converte listas/arrays de graus em arrays de radianos"""
+    return np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lons, dtype=float))
+
+
+def haversine_block(lat1, lon1, lat2, lon2):
+    """Distâncias em metros entre cada ponto 1 (linhas) e cada ponto 2 (colunas), já em radianos"""
+    dlat = lat2[None, :] - lat1[:, None]
+    dlon = lon2[None, :] - lon1[:, None]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1)[:, None] * np.cos(lat2)[None, :] * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS * 2 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def iter_distance_matrix(lats1, lons1, lats2, lons2, max_elements=MAX_CHUNK_ELEMENTS):
+    """Gera a matriz de distâncias em blocos de linhas: (índice inicial, bloco)
+
+    O tamanho do bloco é escolhido para que nenhum bloco passe de max_elements,
+    mantendo a memória limitada mesmo com milhões de pares.
+    """
+    lat1, lon1 = to_radians(lats1, lons1)
+    lat2, lon2 = to_radians(lats2, lons2)
+    rows = max(1, max_elements // max(len(lat2), 1))
+    for start in range(0, len(lat1), rows):
+        stop = start + rows
+        yield start, haversine_block(lat1[start:stop], lon1[start:stop], lat2, lon2)
+
+
+def distance_matrix(lats1, lons1, lats2, lons2):
+    """Matriz completa (n x m) de distâncias em metros"""
+    blocks = [block for _, block in iter_distance_matrix(lats1, lons1, lats2, lons2)]
+    if not blocks:
+        return np.empty((0, len(lats2)))
+    return np.vstack(blocks)
+
+
+def top_k(lats1, lons1, lats2, lons2, k=1, max_elements=MAX_CHUNK_ELEMENTS):
+    """Para cada ponto 1, os índices e distâncias dos k pontos 2 mais próximos
+
+    Retorna (índices, distâncias), ambos n x k e ordenados da menor para a maior distância.
+    """
+    n = len(lats1)
+    k = min(k, len(lats2))
+    indexes = np.empty((n, k), dtype=np.intp)
+    distances = np.empty((n, k))
+    if k == 0:
+        return indexes, distances
+
+    for start, block in iter_distance_matrix(lats1, lons1, lats2, lons2, max_elements):
+        if k < block.shape[1]:
+            candidates = np.argpartition(block, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(block.shape[1]), block.shape)
+        candidate_distances = np.take_along_axis(block, candidates, axis=1)
+        order = np.argsort(candidate_distances, axis=1)
+        stop = start + block.shape[0]
+        indexes[start:stop] = np.take_along_axis(candidates, order, axis=1)
+        distances[start:stop] = np.take_along_axis(candidate_distances, order, axis=1)
+    return indexes, distances
+
+
+def within_radius(lats1, lons1, lats2, lons2, radius, max_elements=MAX_CHUNK_ELEMENTS):
+    """Máscara booleana dos pontos 1 que estão a até radius metros de algum ponto 2"""
+    mask = np.zeros(len(lats1), dtype=bool)
+    for start, block in iter_distance_matrix(lats1, lons1, lats2, lons2, max_elements):
+        mask[start:start + block.shape[0]] = (block <= radius).any(axis=1)
+    return mask
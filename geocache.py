@@ -0,0 +1,100 @@
+import sqlite3
+import threading
+import time
+
+# Marcador para distinguir "não está no cache" de "endereço sabidamente não encontrado"
+MISS = object()
+
+DAY = 24 * 60 * 60
+
+
+class GeocodeCache:
+    """Cache persistente (SQLite) de resultados de geocodificação, incluindo negativos"""
+
+    def __init__(self, path, ttl_days=180, negative_ttl_days=30, max_entries=50000):
+        self.ttl = ttl_days * DAY
+        self.negative_ttl = negative_ttl_days * DAY
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "negative_hits": 0, "misses": 0, "stored": 0}
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode (
+                key TEXT PRIMARY KEY,
+                lat REAL,
+                lon REAL,
+                variant TEXT,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            )
+        """)
+        self.evict()
+
+    def evict(self):
+        """Remove entradas expiradas e as menos usadas além do limite de tamanho"""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM geocode WHERE created_at < ? OR (lat IS NULL AND created_at < ?)",
+                (now - self.ttl, now - self.negative_ttl)
+            )
+            self.conn.execute(
+                "DELETE FROM geocode WHERE key NOT IN "
+                "(SELECT key FROM geocode ORDER BY used_at DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+
+    def get(self, key):
+        """Retorna (lat, lon), None para resultado negativo ou MISS se não houver entrada válida"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT lat, lon, created_at FROM geocode WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return MISS
+            lat, lon, created_at = row
+            ttl = self.ttl if lat is not None else self.negative_ttl
+            if created_at < now - ttl:
+                self.stats["misses"] += 1
+                return MISS
+            with self.conn:
+                self.conn.execute("UPDATE geocode SET used_at = ? WHERE key = ?", (now, key))
+            if lat is None:
+                self.stats["negative_hits"] += 1
+                return None
+            self.stats["hits"] += 1
+            return (lat, lon)
+
+    def put(self, key, coords, variant=None):
+        """Grava o resultado; coords=None registra que o endereço não foi encontrado"""
+        now = time.time()
+        lat, lon = coords if coords else (None, None)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO geocode (key, lat, lon, variant, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, lat, lon, variant, now, now)
+            )
+            self.stats["stored"] += 1
+
+    def variant_counts(self):
+        """Conta quantas entradas foram resolvidas por cada variante de clean_address"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT COALESCE(variant, 'nao_encontrado'), COUNT(*) FROM geocode GROUP BY 1"
+            ).fetchall()
+        return dict(rows)
+
+    def summary(self):
+        """Resumo legível da taxa de acerto do cache na execução atual"""
+        hits = self.stats["hits"] + self.stats["negative_hits"]
+        total = hits + self.stats["misses"]
+        rate = hits / total * 100 if total else 0
+        return (f"{hits}/{total} acertos ({rate:.0f}%, {self.stats['negative_hits']} negativos), "
+                f"{self.stats['stored']} novas entradas")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
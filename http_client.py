@@ -0,0 +1,208 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5  # Segundos de espera antes da primeira retentativa
+BACKOFF_MAX = 30.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+DEFAULT_TIMEOUT = (10, 30)  # (conexão, leitura) em segundos
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)  # Limites das faixas do histograma de latência
+
+
+class RateLimiter:
+    """Token bucket que limita a taxa de requisições para um host"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate  # Tokens por segundo
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Bloqueia até haver um token disponível e o consome; retorna o tempo esperado"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+# Limitadores por host, compartilhados por todas as threads
+limiters = {}
+limiters_lock = threading.Lock()
+
+
+def configure_limiter(host, min_interval, burst=1):
+    """Registra um limitador para o host com intervalo mínimo (em segundos) entre requisições"""
+    with limiters_lock:
+        limiters[host] = RateLimiter(1 / min_interval, burst)
+        return limiters[host]
+
+
+def wait_for_host(url):
+    """Aguarda a vez de fazer uma requisição para o host da URL (sem limite se não configurado)"""
+    host = urlparse(url).hostname
+    limiter = limiters.get(host)
+    if limiter:
+        record(host, waited=limiter.acquire())
+
+
+# Uma sessão (pool keep-alive) por host e por thread: requests.Session não é thread-safe
+sessions = threading.local()
+
+# Contadores por host: requisições, erros, retentativas e latência
+stats = {}
+stats_lock = threading.Lock()
+
+
+def get_session(host):
+    """Retorna a sessão da thread atual para o host, criando-a se necessário"""
+    by_host = getattr(sessions, "by_host", None)
+    if by_host is None:
+        by_host = sessions.by_host = {}
+    if host not in by_host:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        by_host[host] = session
+    return by_host[host]
+
+
+def latency_bucket(latency):
+    """Índice da faixa do histograma para a latência (em segundos)"""
+    milliseconds = latency * 1000
+    for i, limit in enumerate(LATENCY_BUCKETS_MS):
+        if milliseconds <= limit:
+            return i
+    return len(LATENCY_BUCKETS_MS)
+
+
+def record(host, latency=None, error=False, retry=False, waited=0.0, slept=0.0):
+    """Atualiza os contadores do host
+
+    waited é o tempo parado no limitador de taxa e slept o tempo de espera entre
+    retentativas, ambos separados da latência das requisições.
+    """
+    with stats_lock:
+        host_stats = stats.setdefault(host, {
+            "requests": 0, "errors": 0, "retries": 0, "latency_total": 0.0, "latency_max": 0.0,
+            "histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1), "limiter_wait": 0.0, "backoff_sleep": 0.0
+        })
+        if latency is not None:
+            host_stats["requests"] += 1
+            host_stats["latency_total"] += latency
+            host_stats["latency_max"] = max(host_stats["latency_max"], latency)
+            host_stats["histogram"][latency_bucket(latency)] += 1
+        if error:
+            host_stats["errors"] += 1
+        if retry:
+            host_stats["retries"] += 1
+        host_stats["limiter_wait"] += waited
+        host_stats["backoff_sleep"] += slept
+
+
+def retry_after_seconds(response):
+    """Interpreta o cabeçalho Retry-After (segundos ou data HTTP), se houver"""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt):
+    """Espera exponencial com jitter completo para a tentativa (começando em 0)"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def request(method, url, max_retries=MAX_RETRIES, **kwargs):
+    """Faz uma requisição HTTP pelo pool do host, respeitando o limitador e com retentativas
+
+    Falhas de conexão, timeouts e status 429/5xx são tentados de novo com espera exponencial
+    (ou o Retry-After do servidor). Se as tentativas acabarem, devolve a última resposta
+    (para o chamador usar raise_for_status) ou relança a última exceção.
+    """
+    host = urlparse(url).hostname
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    for attempt in range(max_retries):
+        wait_for_host(url)
+        start = time.monotonic()
+        try:
+            response = get_session(host).request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            record(host, time.monotonic() - start, error=True)
+            if attempt == max_retries - 1:
+                raise
+            delay = backoff_delay(attempt)
+            record(host, retry=True, slept=delay)
+            time.sleep(delay)
+            continue
+
+        failed = response.status_code in RETRY_STATUS
+        record(host, time.monotonic() - start, error=failed or response.status_code >= 400)
+        if not failed or attempt == max_retries - 1:
+            return response
+
+        delay = retry_after_seconds(response)
+        delay = min(BACKOFF_MAX, delay) if delay is not None else backoff_delay(attempt)
+        record(host, retry=True, slept=delay)
+        time.sleep(delay)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def reset_stats():
+    """Zera os contadores (nova execução no mesmo processo)"""
+    with stats_lock:
+        stats.clear()
+
+
+def snapshot():
+    """Cópia dos contadores por host para o perfil JSON, com os limites das faixas do histograma"""
+    with stats_lock:
+        hosts = {host: {**host_stats, "histogram": list(host_stats["histogram"])}
+                 for host, host_stats in stats.items()}
+    return {"latency_buckets_ms": list(LATENCY_BUCKETS_MS), "hosts": hosts}
+
+
+def summary():
+    """Linhas com os contadores de cada host para o relatório final"""
+    lines = []
+    with stats_lock:
+        for host, host_stats in sorted(stats.items()):
+            count = host_stats["requests"]
+            average = host_stats["latency_total"] / count * 1000 if count else 0
+            lines.append(
+                f"{host}: {count} requisições, {host_stats['errors']} erros, "
+                f"{host_stats['retries']} retentativas, latência média {average:.0f} ms "
+                f"(máx. {host_stats['latency_max'] * 1000:.0f} ms), "
+                f"{host_stats['limiter_wait']:.1f} s no limitador, {host_stats['backoff_sleep']:.1f} s em esperas"
+            )
+    return lines
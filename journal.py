@@ -0,0 +1,152 @@
+import json
+import sqlite3
+import threading
+import time
+
+# Etapas em ordem de progresso; "routed" significa linha completa, pronta para o CSV
+STAGES = ("fetched", "geocoded", "routed")
+
+
+class WorkJournal:
+    """Diário (SQLite) do progresso de cada restaurante, para retomar execuções interrompidas
+
+    Cada URL guarda a última etapa concluída e o que ela produziu (dados da página,
+    coordenadas, linha final). Numa nova execução, só as etapas que faltam são refeitas.
+    Depois que a linha completa vai para o CSV, a entrada é apagada.
+    """
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS journal (
+                url TEXT PRIMARY KEY,
+                stage TEXT,
+                info TEXT,
+                lat REAL,
+                lon REAL,
+                row TEXT,
+                written INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    def execute(self, sql, params):
+        with self.lock, self.conn:
+            self.conn.execute(sql, params)
+
+    def ensure(self, url):
+        """Cria a entrada da URL se ainda não existir"""
+        now = time.time()
+        self.execute(
+            "INSERT OR IGNORE INTO journal (url, created_at, updated_at) VALUES (?, ?, ?)",
+            (url, now, now)
+        )
+
+    def get(self, url):
+        """Retorna a entrada da URL (dados já decodificados) ou None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT stage, info, lat, lon, row, written, attempts, error FROM journal WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        stage, info, lat, lon, data, written, attempts, error = row
+        return {
+            "stage": stage,
+            "info": json.loads(info) if info else None,
+            "coords": (lat, lon) if lat is not None else None,
+            "row": json.loads(data) if data else None,
+            "written": bool(written),
+            "attempts": attempts,
+            "error": error,
+        }
+
+    def record_fetched(self, url, info):
+        """Página baixada e interpretada"""
+        self.ensure(url)
+        self.execute(
+            "UPDATE journal SET stage = 'fetched', info = ?, error = NULL, updated_at = ? WHERE url = ?",
+            (json.dumps(info, ensure_ascii=False), time.time(), url)
+        )
+
+    def record_geocoded(self, url, coords):
+        """Geocodificação resolvida (coords=None quando não há endereço)"""
+        lat, lon = coords if coords else (None, None)
+        self.execute(
+            "UPDATE journal SET stage = 'geocoded', lat = ?, lon = ?, error = NULL, updated_at = ? WHERE url = ?",
+            (lat, lon, time.time(), url)
+        )
+
+    def record_row(self, url, row, complete, error=None):
+        """Guarda a linha montada; se incompleta, conta uma tentativa para ser refeita depois"""
+        self.ensure(url)
+        data = json.dumps({k: v for k, v in row.items() if not k.startswith("_")}, ensure_ascii=False)
+        if complete:
+            self.execute(
+                "UPDATE journal SET stage = 'routed', row = ?, error = NULL, updated_at = ? WHERE url = ?",
+                (data, time.time(), url)
+            )
+        else:
+            self.execute(
+                "UPDATE journal SET row = ?, attempts = attempts + 1, error = ?, updated_at = ? WHERE url = ?",
+                (data, error, time.time(), url)
+            )
+
+    def record_failure(self, url, error):
+        """Registra uma falha na etapa atual"""
+        self.ensure(url)
+        self.execute(
+            "UPDATE journal SET attempts = attempts + 1, error = ?, updated_at = ? WHERE url = ?",
+            (error, time.time(), url)
+        )
+
+    def mark_written(self, urls):
+        """Checkpoint após gravar o CSV: apaga as entradas completas e marca as parciais como gravadas"""
+        with self.lock, self.conn:
+            for url in urls:
+                self.conn.execute("DELETE FROM journal WHERE url = ? AND stage = 'routed'", (url,))
+                self.conn.execute("UPDATE journal SET written = 1 WHERE url = ?", (url,))
+
+    def pending(self, max_attempts):
+        """URLs a retomar: incompletas com tentativas sobrando ou completas ainda fora do CSV"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url FROM journal "
+                "WHERE (stage IS NOT 'routed' AND attempts < ?) OR (stage = 'routed' AND written = 0) "
+                "ORDER BY created_at",
+                (max_attempts,)
+            ).fetchall()
+        return [url for (url,) in rows]
+
+    def given_up(self, max_attempts):
+        """URLs incompletas que já esgotaram as tentativas, com ou sem linha parcial
+
+        Não devem ser coletadas de novo como restaurantes novos.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url FROM journal WHERE stage IS NOT 'routed' AND attempts >= ?",
+                (max_attempts,)
+            ).fetchall()
+        return {url for (url,) in rows}
+
+    def exhausted(self, max_attempts):
+        """Linhas parciais das URLs que já esgotaram as tentativas: {url: linha}
+
+        Elas não são mais retomadas, mas continuam indo para o CSV com o que foi obtido.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url, row FROM journal "
+                "WHERE stage IS NOT 'routed' AND attempts >= ? AND row IS NOT NULL ORDER BY created_at",
+                (max_attempts,)
+            ).fetchall()
+        return {url: json.loads(data) for url, data in rows}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
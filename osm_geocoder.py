@@ -0,0 +1,263 @@
+"""Geocodificador local montado a partir de um extrato do OpenStreetMap, sem ida à rede
+
+O índice (SQLite) guarda os logradouros, com busca FTS5 pelo nome, e os números conhecidos
+de cada um (nós e prédios com addr:street/addr:housenumber), ordenados por logradouro e
+número. A busca separa o número do endereço limpo, acha o logradouro e interpola entre os
+dois números conhecidos mais próximos. O que não for resolvido continua indo para a Nominatim.
+
+Uso: python osm_geocoder.py montar sao-paulo.osm.bz2 [osm_geocoder.sqlite]
+     python osm_geocoder.py buscar "Av. Paulista, 1578" [osm_geocoder.sqlite]
+"""
+import bz2
+import gzip
+import os
+import re
+import sqlite3
+import sys
+import threading
+import xml.etree.ElementTree as ET
+
+from address import clean_address, street_key
+
+NUMBER = re.compile(r"^(.*?)\s*(\d+)$")  # Logradouro e número no fim do endereço limpo
+HOUSE_NUMBER = re.compile(r"\d+")  # "1004A", "1004-1010" -> 1004
+MAX_GAP = 2000  # Maior distância entre os números vizinhos para interpolar
+MAX_EXTRAPOLATION = 100  # Além do último número conhecido, aceita o ponto dele até essa diferença
+
+
+def open_extract(path):
+    """Abre o extrato XML do OSM, comprimido ou não"""
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_elements(path):
+    """Percorre os nós e caminhos do extrato sem manter a árvore inteira na memória"""
+    with open_extract(path) as f:
+        events = ET.iterparse(f, events=("start", "end"))
+        _, root = next(events)
+        for event, elem in events:
+            if event == "end" and elem.tag in ("node", "way", "relation"):
+                yield elem
+                root.clear()
+
+
+def element_tags(elem):
+    return {tag.get("k"): tag.get("v") for tag in elem.iter("tag")}
+
+
+def house_address(tags):
+    """(chave do logradouro, nome, número) das tags addr:*, ou None"""
+    street, house_number = tags.get("addr:street"), tags.get("addr:housenumber")
+    if not street or not house_number:
+        return None
+    number = HOUSE_NUMBER.search(house_number)
+    key = street_key(street)
+    if not number or not key:
+        return None
+    return key, street, int(number.group(0))
+
+
+def read_extract(path):
+    """Lê os pontos com endereço do extrato: {(chave, número): [(lat, lon), ...]} e {chave: nome}
+
+    A primeira passada junta os prédios (caminhos) com endereço e os nós que eles usam; a
+    segunda lê as coordenadas só desses nós, além dos nós que têm endereço próprio.
+    """
+    buildings = []
+    needed = set()
+    for elem in iter_elements(path):
+        if elem.tag == "way":
+            found = house_address(element_tags(elem))
+            if found:
+                refs = [int(nd.get("ref")) for nd in elem.iter("nd")]
+                if len(refs) > 1 and refs[0] == refs[-1]:
+                    refs.pop()  # Caminho fechado repete o primeiro nó no fim
+                buildings.append((found, refs))
+                needed.update(refs)
+
+    points = {}
+    names = {}
+    coords = {}
+    for elem in iter_elements(path):
+        if elem.tag != "node":
+            continue
+        node_id = int(elem.get("id"))
+        lat, lon = float(elem.get("lat")), float(elem.get("lon"))
+        if node_id in needed:
+            coords[node_id] = (lat, lon)
+        found = house_address(element_tags(elem))
+        if found:
+            key, name, number = found
+            names.setdefault(key, name)
+            points.setdefault((key, number), []).append((lat, lon))
+
+    for (key, name, number), refs in buildings:
+        corners = [coords[ref] for ref in refs if ref in coords]
+        if corners:
+            names.setdefault(key, name)
+            centroid = (sum(c[0] for c in corners) / len(corners), sum(c[1] for c in corners) / len(corners))
+            points.setdefault((key, number), []).append(centroid)
+    return points, names
+
+
+def build_index(extract_path, index_path):
+    """Monta o índice a partir do extrato; retorna (logradouros, pontos)
+
+    O banco é montado num arquivo temporário e trocado de uma vez.
+    """
+    points, names = read_extract(extract_path)
+    temp_path = index_path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = sqlite3.connect(temp_path)
+    try:
+        with conn:
+            conn.execute("CREATE TABLE streets (id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, name TEXT NOT NULL)")
+            conn.execute("""
+                CREATE TABLE points (
+                    street_id INTEGER NOT NULL,
+                    number INTEGER NOT NULL,
+                    lat REAL NOT NULL,
+                    lon REAL NOT NULL,
+                    PRIMARY KEY (street_id, number)
+                ) WITHOUT ROWID
+            """)
+            street_ids = {key: i for i, key in enumerate(sorted(names), start=1)}
+            conn.executemany("INSERT INTO streets (id, key, name) VALUES (?, ?, ?)",
+                             ((i, key, names[key]) for key, i in street_ids.items()))
+            # Números repetidos (nó e prédio, ou vários prédios) viram a média dos pontos
+            conn.executemany(
+                "INSERT INTO points (street_id, number, lat, lon) VALUES (?, ?, ?, ?)",
+                ((street_ids[key], number, sum(c[0] for c in found) / len(found), sum(c[1] for c in found) / len(found))
+                 for (key, number), found in points.items())
+            )
+            try:
+                conn.execute("CREATE VIRTUAL TABLE streets_fts USING fts5(key, content='streets', content_rowid='id')")
+                conn.execute("INSERT INTO streets_fts (rowid, key) SELECT id, key FROM streets")
+            except sqlite3.OperationalError:  # SQLite sem FTS5: só a busca pelo nome exato
+                pass
+    finally:
+        conn.close()
+    os.replace(temp_path, index_path)
+    return len(names), len(points)
+
+
+def split_number(cleaned_address):
+    """Separa "Rua Treze de Maio 1004" em ("Rua Treze de Maio", 1004); número None se não houver"""
+    match = NUMBER.match(cleaned_address)
+    if not match or not match.group(1):
+        return cleaned_address, None
+    return match.group(1), int(match.group(2))
+
+
+class LocalGeocoder:
+    """Consulta o índice montado por build_index (pode ser usado por várias threads)"""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.stats = {"exact": 0, "interpolated": 0, "misses": 0}
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self.fts = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'streets_fts'"
+        ).fetchone() is not None
+
+    def find_street(self, key):
+        """Id do logradouro pelo nome exato ou, sem ele, o de nome mais curto com todas as palavras"""
+        row = self.conn.execute("SELECT id FROM streets WHERE key = ?", (key,)).fetchone()
+        if row or not self.fts or len(key.split()) < 2:
+            return row[0] if row else None
+        query = " ".join(f'"{word}"' for word in key.split())
+        row = self.conn.execute(
+            "SELECT s.id FROM streets_fts JOIN streets s ON s.id = streets_fts.rowid "
+            "WHERE streets_fts MATCH ? ORDER BY length(s.key) LIMIT 1",
+            (query,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def neighbours(self, street_id, number, parity):
+        """Números conhecidos imediatamente abaixo e acima (do mesmo lado da rua, se parity não for None)"""
+        side = "" if parity is None else " AND number % 2 = ?"
+        args = (street_id, number) + (() if parity is None else (parity,))
+        below = self.conn.execute(
+            f"SELECT number, lat, lon FROM points WHERE street_id = ? AND number <= ?{side} "
+            "ORDER BY number DESC LIMIT 1", args
+        ).fetchone()
+        above = self.conn.execute(
+            f"SELECT number, lat, lon FROM points WHERE street_id = ? AND number >= ?{side} "
+            "ORDER BY number LIMIT 1", args
+        ).fetchone()
+        return below, above
+
+    def locate(self, street_id, number):
+        for parity in (number % 2, None):
+            below, above = self.neighbours(street_id, number, parity)
+            if below and below[0] == number:
+                return below[1:], "exact"
+            if below and above and above[0] - below[0] <= MAX_GAP:
+                t = (number - below[0]) / (above[0] - below[0])
+                return (below[1] + (above[1] - below[1]) * t, below[2] + (above[2] - below[2]) * t), "interpolated"
+            for point in (below, above):
+                if point and abs(point[0] - number) <= MAX_EXTRAPOLATION:
+                    return point[1:], "interpolated"
+        return None, None
+
+    def lookup(self, cleaned_address):
+        """Converte a saída do clean_address em ((lat, lon), "exact"/"interpolated"), ou (None, None)"""
+        if not cleaned_address:
+            return None, None
+        street, number = split_number(cleaned_address)
+        key = street_key(street)
+        if not key or number is None:
+            return None, None
+        with self.lock:
+            street_id = self.find_street(key)
+            if street_id is None:
+                return None, None
+            coords, kind = self.locate(street_id, number)
+        return (tuple(coords), kind) if coords else (None, None)
+
+    def geocode(self, address):
+        """Geocodifica o endereço bruto com as duas variantes do clean_address; None se não resolver"""
+        coords, kind = self.lookup(clean_address(address, try_with_prefixes=True))
+        if coords is None:
+            coords, kind = self.lookup(clean_address(address, try_with_prefixes=False))
+        with self.lock:
+            self.stats[kind or "misses"] += 1
+        return coords
+
+    def summary(self):
+        """Resumo legível dos endereços consultados na execução atual"""
+        total = sum(self.stats.values())
+        found = self.stats["exact"] + self.stats["interpolated"]
+        rate = found / total * 100 if total else 0
+        return (f"{found}/{total} resolvidos sem rede ({rate:.0f}%, "
+                f"{self.stats['interpolated']} interpolados)")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ("montar", "buscar"):
+        print("Uso: python osm_geocoder.py montar <extrato.osm[.bz2|.gz]> [indice.sqlite]")
+        print("     python osm_geocoder.py buscar <endereço> [indice.sqlite]")
+        sys.exit(1)
+    index_path = sys.argv[3] if len(sys.argv) > 3 else "osm_geocoder.sqlite"
+    if sys.argv[1] == "montar":
+        streets, points = build_index(sys.argv[2], index_path)
+        print(f"✅ {streets} logradouros e {points} números gravados em {index_path}")
+        return
+    geocoder = LocalGeocoder(index_path)
+    cleaned = clean_address(sys.argv[2])
+    coords = geocoder.geocode(sys.argv[2])
+    print(f"📍 {cleaned}: {coords}" if coords else f"⚠️ {cleaned}: não encontrado no índice local")
+    geocoder.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Saídas tipadas (SQLite e Parquet) geradas a partir das mesmas linhas do CSV
+
+No CSV tudo é texto: "N/A" como ausente, distâncias formatadas e "X"/"" nas 14 colunas
+de horário. Aqui as distâncias e tempos viram números (NULL quando ausentes) e os
+horários viram duas máscaras de 7 bits (bit 0 = domingo ... bit 6 = sábado).
+"""
+import os
+import sqlite3
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pyarrow é opcional: sem ele, a saída Parquet é pulada
+    pyarrow = None
+
+DAYS = ["dom", "seg", "ter", "qua", "qui", "sex", "sab"]
+TEXT_FIELDS = ["nome", "endereco", "contato", "cozinha", "link", "Linha", "Estacao", "Fonte",
+               "Linha_2", "Estacao_2", "delistado"]
+NUMBER_FIELDS = ["Distancia", "Tempo", "Distancia_reta", "Distancia_2", "Tempo_2"]
+MASK_FIELDS = ["almoco", "jantar"]
+INDEXED_FIELDS = ["Estacao", "Linha", "cozinha", "link"]
+
+
+def parse_number(value):
+    """Converte um campo numérico do CSV, ou None para "N/A" e vazios"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def schedule_mask(row, meal):
+    """Empacota as colunas <refeição>_<dia> ("X" ou "") numa máscara de 7 bits"""
+    return sum(1 << bit for bit, day in enumerate(DAYS) if row.get(f"{meal}_{day}") == "X")
+
+
+def typed_row(row):
+    """Converte uma linha do CSV para os tipos das saídas colunares"""
+    typed = {field: (row.get(field) if row.get(field) not in ("", "N/A") else None) for field in TEXT_FIELDS}
+    typed.update({field: parse_number(row.get(field)) for field in NUMBER_FIELDS})
+    typed.update({meal: schedule_mask(row, meal) for meal in MASK_FIELDS})
+    return typed
+
+
+def write_sqlite(rows, path):
+    """Grava as linhas numa tabela "restaurantes" indexada por estação, linha, cozinha e link
+
+    O banco é montado num arquivo temporário e trocado de uma vez, como o CSV.
+    """
+    temp_path = path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = sqlite3.connect(temp_path)
+    try:
+        columns = ([f"{field} TEXT" for field in TEXT_FIELDS] + [f"{field} REAL" for field in NUMBER_FIELDS]
+                   + [f"{field} INTEGER NOT NULL" for field in MASK_FIELDS])
+        fields = TEXT_FIELDS + NUMBER_FIELDS + MASK_FIELDS
+        with conn:
+            conn.execute(f"CREATE TABLE restaurantes ({', '.join(columns)})")
+            conn.executemany(
+                f"INSERT INTO restaurantes ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})",
+                ([typed[field] for field in fields] for typed in map(typed_row, rows))
+            )
+            for field in INDEXED_FIELDS:
+                conn.execute(f"CREATE INDEX idx_restaurantes_{field.lower()} ON restaurantes ({field})")
+    finally:
+        conn.close()
+    os.replace(temp_path, path)
+
+
+def write_parquet(rows, path):
+    """Grava as linhas num arquivo Parquet tipado; retorna False se o pyarrow não estiver instalado"""
+    if pyarrow is None:
+        return False
+    typed = [typed_row(row) for row in rows]
+    schema = pyarrow.schema(
+        [(field, pyarrow.string()) for field in TEXT_FIELDS]
+        + [(field, pyarrow.float64()) for field in NUMBER_FIELDS]
+        + [(field, pyarrow.uint8()) for field in MASK_FIELDS]
+    )
+    table = pyarrow.Table.from_pylist(typed, schema=schema)
+    temp_path = path + ".tmp"
+    pyarrow.parquet.write_table(table, temp_path)
+    os.replace(temp_path, path)
+    return True
@@ -0,0 +1,109 @@
+"""Extratores diretos (lxml) para a listagem e as páginas de restaurante do Duo Gourmet
+
+Em vez de montar uma árvore BeautifulSoup e rodar vários seletores CSS com :has(),
+cada página é percorrida uma vez só pelos elementos que interessam. O resultado é o
+mesmo dos seletores usados em pega_os_duo.py.
+"""
+try:
+    import lxml.html
+except ImportError:  # lxml é opcional: sem ele, pega_os_duo.py usa o BeautifulSoup
+    lxml = None
+
+# Ícone ao lado do <h4> de cada bloco de informação -> campo
+SECTION_ICONS = (("flat-pin", "endereco"), ("phone", "contato"), ("chef", "cozinha"))
+
+
+def available():
+    """Indica se o backend lxml está instalado"""
+    return lxml is not None
+
+
+def next_element(element):
+    """Próximo irmão que seja elemento (ignora comentários)"""
+    sibling = element.getnext()
+    while sibling is not None and not isinstance(sibling.tag, str):
+        sibling = sibling.getnext()
+    return sibling
+
+
+def has_check(cell):
+    """Indica se a célula do calendário tem o ícone de disponível"""
+    for element in cell.iter():
+        if "check.png" in (element.get("src") or ""):
+            return True
+    return False
+
+
+def extract_calendar(table):
+    """Lê as linhas de almoço e jantar da tabela de horários"""
+    almoco = [""] * 7
+    jantar = [""] * 7
+    if table is None:
+        return almoco, jantar
+
+    rows = [row for tbody in table.iter("tbody") for row in tbody.iter("tr")]
+    if len(rows) >= 2:
+        almoco = ["X" if has_check(cell) else "" for cell in list(rows[0].iter("td"))[1:]]
+        jantar = ["X" if has_check(cell) else "" for cell in list(rows[1].iter("td"))[1:]]
+    return almoco, jantar
+
+
+def extract_restaurant(html):
+    """Extrai nome, endereço, contato, cozinha e calendário em uma passada pelo documento
+
+    Retorna os textos crus (sem strip); o tratamento fica com o chamador.
+    """
+    doc = lxml.html.fromstring(html)
+    found = {"nome": None, "endereco": None, "contato": None, "cozinha": None}
+    table = None
+
+    for element in doc.iter("h1", "h4", "table"):
+        tag = element.tag
+        if tag == "h1":
+            if found["nome"] is None:
+                found["nome"] = element.text_content()
+        elif tag == "table":
+            if table is None:
+                table = element
+        else:
+            icons = [img.get("src", "") for img in element.iter("img")]
+            for icon, field in SECTION_ICONS:
+                if found[field] is not None or not any(icon in src for src in icons):
+                    continue
+                sibling = next_element(element)
+                if field == "endereco":
+                    # h4 + address p
+                    if sibling is not None and sibling.tag == "address":
+                        paragraph = next(sibling.iter("p"), None)
+                        if paragraph is not None:
+                            found[field] = paragraph.text_content()
+                elif sibling is not None and sibling.tag == "p":
+                    # h4 + p
+                    found[field] = sibling.text_content()
+
+    found["almoco"], found["jantar"] = extract_calendar(table)
+    return found
+
+
+def extract_listing(html, href_prefix):
+    """Extrai (nome, href) de cada div.restaurant-card da listagem"""
+    doc = lxml.html.fromstring(html)
+    cards = []
+    for card in doc.iter("div"):
+        if "restaurant-card" not in card.get("class", "").split():
+            continue
+        link = next((a for a in card.iter("a") if a.get("href", "").startswith(href_prefix)), None)
+        if link is None:
+            continue
+        title = next(card.iter("h3"), None)
+        cards.append((title.text_content() if title is not None else None, link.get("href")))
+    return cards
+
+
+def extract_next_page(html):
+    """Retorna o href do link rel="next" da listagem (paginação), se houver"""
+    doc = lxml.html.fromstring(html)
+    for element in doc.iter("a", "link"):
+        if "next" in element.get("rel", "").split() and element.get("href"):
+            return element.get("href")
+    return None
@@ -0,0 +1,70 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+def content_hash(text):
+    """Hash do conteúdo da página, usado para detectar mudanças sem reprocessar o HTML"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class PageStateStore:
+    """Guarda (SQLite) ETag, Last-Modified, hash do conteúdo e endereço de cada página de restaurante"""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                address TEXT,
+                checked_at REAL NOT NULL
+            )
+        """)
+
+    def get(self, url):
+        """Retorna o estado salvo da página como dicionário (ou None)"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, content_hash, address FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("etag", "last_modified", "content_hash", "address"), row))
+
+    def conditional_headers(self, url):
+        """Cabeçalhos If-None-Match/If-Modified-Since para uma requisição condicional"""
+        state = self.get(url)
+        headers = {}
+        if state and state["etag"]:
+            headers["If-None-Match"] = state["etag"]
+        if state and state["last_modified"]:
+            headers["If-Modified-Since"] = state["last_modified"]
+        return headers
+
+    def save(self, url, response, text_hash, address):
+        """Atualiza o estado da página a partir de uma resposta 200"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, content_hash, address, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                 text_hash, address, time.time())
+            )
+
+    def touch(self, url, response):
+        """Registra uma verificação sem mudança, guardando validadores novos se vierem"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE pages SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), "
+                "checked_at = ? WHERE url = ?",
+                (response.headers.get("ETag"), response.headers.get("Last-Modified"), time.time(), url)
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
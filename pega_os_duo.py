@@ -1,168 +1,320 @@
 import requests
 from bs4 import BeautifulSoup
 import csv
-import time
+import json
 import os
 import re
-from math import radians, sin, cos, sqrt, atan2
-from urllib.parse import urlparse
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+from urllib.parse import urljoin, urlparse
+import http_client
+from http_client import configure_limiter
+from geocache import GeocodeCache, MISS
+from address import clean_address, canonical_key
+from osm_geocoder import LocalGeocoder
+from page_state import PageStateStore, content_hash
+from journal import WorkJournal
+from walk_estimator import WalkEstimator
+import output_writers
+from output_writers import DAYS
+import profiler
+from station_index import StationIndex
+from station_grid import StationGrid, file_hash
+from station_table import StationTable, read_stations_csv
+import distance_matrix
+import page_parser
 
 # Configurações globais
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 BASE_URL = "https://www.duogourmet.com.br"
 LIST_URL = f"{BASE_URL}/restaurantes/sao-paulo"
+CITY_NAME = "São Paulo"  # Cidade da listagem (usada para normalizar os endereços)
+GEOCODE_REGION = "São Paulo, Brasil"  # Sufixo das buscas na Nominatim, que puxa o resultado para a cidade
 HEADERS = {"User-Agent": "Mozilla/5.0"}
 CSV_FILE = "restaurantes_com_metro_google.csv"
-DAYS = ["dom", "seg", "ter", "qua", "qui", "sex", "sab"]
+PROFILE = os.getenv("PROFILE", "run_profile.json")  # Perfil da execução (tempo por etapa, latência por host)
+OUTPUT_FORMATS = [f.strip() for f in os.getenv("OUTPUT_FORMATS", "csv").split(",") if f.strip()]  # Além do CSV: "sqlite", "parquet"
+CHECK_ICON = re.compile(r"check\.png")  # Ícone de dia disponível no calendário
+SCHEDULE_FIELDS = [f"almoco_{d}" for d in DAYS] + [f"jantar_{d}" for d in DAYS]
 GOOGLE_API_DELAY = 0.1  # Delay para a API do Google
-NOMINATIM_DELAY = 0.5  # Delay para a API Nominatim (respeitar política de uso)
+NOMINATIM_DELAY = 1.0  # Delay para a API Nominatim (respeitar política de uso: 1 req/s)
 MAX_RETRIES = 3
 MAX_RESTAURANTS = int(os.getenv("MAX_RESTAURANTS", 5))
 REQUESTS_DELAY = 0.1
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", 4))  # Restaurantes processados em paralelo
 STATIONS_CSV = "estacoes.csv"  # Arquivo com as estações de metrô
 MAX_DISTANCE = int(os.getenv("MAX_DISTANCE", 2000)) # Distância máxima em metros para considerar cálculo de rota a pé
+CANDIDATE_STATIONS = int(os.getenv("CANDIDATE_STATIONS", 1))  # Estações roteadas por restaurante (a de menor tempo a pé vence)
+RECORD_RUNNER_UP = os.getenv("RECORD_RUNNER_UP", "0") == "1"  # Grava também a segunda estação mais rápida
+NEAREST_STATION_BACKEND = os.getenv("NEAREST_STATION_BACKEND", "grid")  # "grid" (pré-calculada), "index" ou "numpy"
+STATIONS_SNAPSHOT = os.getenv("STATIONS_SNAPSHOT", "stations.pickle")  # Tabela de estações pronta, reaproveitada entre processos
+STATION_GRID = os.getenv("STATION_GRID", "station_grid.bin")  # Grade de estações candidatas por célula (reconstruída se o CSV mudar)
+STREAM_LISTING = os.getenv("STREAM_LISTING", "0") == "1"  # Processa na ordem da listagem, sem esperar todas as páginas
+MAX_LISTING_PAGES = int(os.getenv("MAX_LISTING_PAGES", 100))  # Trava de segurança da paginação
+HTML_PARSER = os.getenv("HTML_PARSER", "auto")  # "lxml" (extrator direto), "html.parser" (BeautifulSoup) ou "auto"
+PAGE_STATE = os.getenv("PAGE_STATE", "page_state.sqlite")  # ETag/Last-Modified/hash das páginas para o modo incremental
+JOURNAL = os.getenv("JOURNAL", "work_journal.sqlite")  # Diário de execução (retomada após falhas)
+JOURNAL_MAX_ATTEMPTS = int(os.getenv("JOURNAL_MAX_ATTEMPTS", 3))  # Tentativas antes de desistir de um restaurante
+REFRESH = os.getenv("REFRESH", "0") == "1"  # Revalida os restaurantes já presentes no CSV
+GEOCODE_CACHE = os.getenv("GEOCODE_CACHE", "geocode_cache.sqlite")  # Cache persistente da geocodificação
+GEOCODE_CACHE_TTL_DAYS = int(os.getenv("GEOCODE_CACHE_TTL_DAYS", 180))
+GEOCODE_CACHE_NEGATIVE_TTL_DAYS = int(os.getenv("GEOCODE_CACHE_NEGATIVE_TTL_DAYS", 30))
+LOCAL_GEOCODER = os.getenv("LOCAL_GEOCODER", "osm_geocoder.sqlite")  # Índice do OpenStreetMap (usado se o arquivo existir)
+
+WALK_ESTIMATOR = os.getenv("WALK_ESTIMATOR", "1") == "1"  # Estima localmente as caminhadas previsíveis, sem chamar a Google
+WALK_CONFIDENCE = float(os.getenv("WALK_CONFIDENCE", 0.9))  # Confiança mínima da estimativa para dispensar a Google
+WALK_TOLERANCE = float(os.getenv("WALK_TOLERANCE", 0.15))  # Erro relativo aceito ao medir a confiança
+WALK_MIN_SAMPLES = int(os.getenv("WALK_MIN_SAMPLES", 10))  # Rotas conhecidas necessárias para montar um modelo
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+ROUTES_URL = os.getenv("ROUTES_URL", "https://routes.googleapis.com/distanceMatrix/v2:computeRouteMatrix")
+ROUTES_MAX_ELEMENTS = 625  # Limite de elementos (origens x destinos) por requisição da computeRouteMatrix
+ROUTES_BATCH_SIZE = int(os.getenv("ROUTES_BATCH_SIZE", 0))  # Restaurantes por lote de rotas (0 = uma requisição por restaurante)
+ROUTES_MAX_WASTE = float(os.getenv("ROUTES_MAX_WASTE", 0.25))  # Fração máxima de elementos cobrados sem uso num bloco do lote
+
+# Um limitador por host externo: as threads se sobrepõem, mas cada API mantém sua taxa
+configure_limiter(urlparse(BASE_URL).hostname, REQUESTS_DELAY)
+configure_limiter(urlparse(NOMINATIM_URL).hostname, NOMINATIM_DELAY)
+configure_limiter(urlparse(ROUTES_URL).hostname, GOOGLE_API_DELAY)
 
-# Variável global para cache das estações
+# Variáveis globais para cache das estações e da geocodificação
 stations_cache = None
+stations_index = None
+stations_grid = None
+stations_lock = threading.Lock()
+geocode_cache = None
+geocode_cache_lock = threading.Lock()
+local_geocoder = None
+local_geocoder_lock = threading.Lock()
+page_state = None
+page_state_lock = threading.Lock()
+journal = None
+journal_lock = threading.Lock()
+walk_estimator = None
+walk_estimator_lock = threading.Lock()
 
 def load_stations():
-    """Carrega as estações de metrô do arquivo CSV"""
+    """Carrega as estações de metrô numa StationTable, pelo snapshot ou pelo arquivo CSV"""
     global stations_cache
     if stations_cache is not None:
         return stations_cache
     
-    stations = []
     try:
-        with open(STATIONS_CSV, mode='r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                try:
-                    stations.append({
-                        "linha": row['Linha'],
-                        "nome": row['Nome da Estacao'],
-                        "lat": float(row['Latitude']),
-                        "lon": float(row['Longitude'])
-                    })
-                except (ValueError, KeyError) as e:
-                    print(f"⚠️ Erro ao processar estação {row.get('Nome da Estacao', 'N/A')}: {e}")
+        source_hash = file_hash(STATIONS_CSV)
     except FileNotFoundError:
         print(f"❌ Arquivo {STATIONS_CSV} não encontrado.")
+        stations_cache = StationTable([])
+        return stations_cache
     
-    stations_cache = stations
-    return stations
-
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calcula distância em metros entre coordenadas usando fórmula de Haversine"""
-    R = 6371.0  # Raio da Terra em km
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    return R * 2 * atan2(sqrt(a), sqrt(1-a)) * 1000  # metros
-
-def clean_address(address, try_with_prefixes=True):
-    """Limpa e simplifica o endereço para geocodificação"""
-    if not address or address == "N/A":
-        return None
+    table = StationTable.load_snapshot(STATIONS_SNAPSHOT, source_hash)
+    if table is None:
+        table = StationTable(read_stations_csv(STATIONS_CSV))
+        table.save_snapshot(STATIONS_SNAPSHOT, source_hash)
     
-    # Primeiro tratamento: substitui abreviações
-    if try_with_prefixes:
-        replacements = {
-            r'\bMin\.?\b': 'Ministro',
-            r'\bDes\.?\b': 'Desembargador',
-            r'\bSra\.?\b': 'Senhora',
-            r'\bDr\.?\b': 'Doutor',
-            r'\bPres\.?\b': 'Presidente',
-            r'\bBrig\.?\b': 'Brigadeiro'
-        }
-        
-        for pattern, repl in replacements.items():
-            address = re.sub(pattern, repl, address, flags=re.IGNORECASE)
-    else:
-        # Segundo tratamento: remove completamente os prefixos
-        prefixes_to_remove = [
-            r'\bMin\.?\b\s*', r'\bDes\.?\b\s*', r'\bSra\.?\b\s*',
-            r'\bDr\.?\b\s*', r'\bPres\.?\b\s*', r'\bBrig\.?\b\s*'
-        ]
-        for prefix in prefixes_to_remove:
-            address = re.sub(prefix, '', address, flags=re.IGNORECASE)
-    
-    # Limpeza comum para ambos os casos
-    simplified = re.sub(r'(\d+).*', r'\1', address)  # Remove após números
-    simplified = re.sub(r',?\s*\d{5}-?\d{3}.*', '', simplified)  # Remove CEP
-    simplified = re.sub(r'(pr[óo]ximo|altura|alt|perto|ao lado).*', '', simplified, flags=re.IGNORECASE)
-    simplified = re.sub(r',.*?(?=\s*\d|$)', '', simplified)  # Remove após vírgula
-    simplified = re.sub(r'\s{2,}', ' ', simplified).strip().strip(',')
-    
-    return simplified if simplified else None
+    stations_cache = table
+    return table
+
+def get_station_index():
+    """Monta (uma única vez) o índice espacial das estações"""
+    global stations_index
+    with stations_lock:
+        if stations_index is None:
+            stations_index = StationIndex(load_stations())
+    return stations_index
+
+def get_station_grid():
+    """Abre (uma única vez) a grade pré-calculada, reconstruindo-a se o CSV de estações mudou"""
+    global stations_grid
+    with stations_lock:
+        if stations_grid is None:
+            stations = load_stations()
+            stations_grid = StationGrid.load_or_build(STATION_GRID, stations, STATIONS_CSV) if stations else False
+    return stations_grid
+
+def get_geocode_cache():
+    """Abre (uma única vez) o cache persistente de geocodificação"""
+    global geocode_cache
+    with geocode_cache_lock:
+        if geocode_cache is None:
+            geocode_cache = GeocodeCache(
+                GEOCODE_CACHE,
+                ttl_days=GEOCODE_CACHE_TTL_DAYS,
+                negative_ttl_days=GEOCODE_CACHE_NEGATIVE_TTL_DAYS
+            )
+    return geocode_cache
+
+def get_local_geocoder():
+    """Abre (uma única vez) o índice local do OpenStreetMap; False se ele não foi montado"""
+    global local_geocoder
+    with local_geocoder_lock:
+        if local_geocoder is None:
+            local_geocoder = LocalGeocoder(LOCAL_GEOCODER) if os.path.exists(LOCAL_GEOCODER) else False
+    return local_geocoder
+
+def get_page_state():
+    """Abre (uma única vez) o registro de estado das páginas de restaurante"""
+    global page_state
+    with page_state_lock:
+        if page_state is None:
+            page_state = PageStateStore(PAGE_STATE)
+    return page_state
+
+def get_journal():
+    """Abre (uma única vez) o diário de execução"""
+    global journal
+    with journal_lock:
+        if journal is None:
+            journal = WorkJournal(JOURNAL)
+    return journal
+
+def get_walk_estimator():
+    """Treina (uma única vez) o estimador de caminhada com as rotas da Google já no CSV"""
+    global walk_estimator
+    with walk_estimator_lock:
+        if walk_estimator is None:
+            walk_estimator = WalkEstimator(WALK_TOLERANCE, WALK_MIN_SAMPLES)
+            walk_estimator.add_rows(read_existing_rows())
+            walk_estimator.fit()
+    return walk_estimator
+
+def query_nominatim(cleaned_address):
+    """Consulta a Nominatim e retorna (lat, lon) ou None se não encontrou"""
+    url = f"{NOMINATIM_URL}?q={cleaned_address}, {GEOCODE_REGION}&format=json&limit=1"
+    headers = {"User-Agent": "DuoGourmetMetroFinder/1.0"}
+    response = http_client.get(url, headers=headers)
+    response.raise_for_status()
+    data = response.json()
+    
+    if data:
+        return (float(data[0]["lat"]), float(data[0]["lon"]))
+    return None
 
 def get_coordinates_nominatim(address):
-    """Converte endereço em coordenadas usando Nominatim"""
+    """Converte endereço em coordenadas usando Nominatim (com cache persistente)"""
     # Primeiro tenta com os prefixos substituídos
     cleaned_address = clean_address(address, try_with_prefixes=True)
     if not cleaned_address:
         print("⚠️ Endereço inválido ou vazio após limpeza")
         return None
     
+    # O índice local responde sem rede; a Nominatim fica só para o que ele não resolve
+    local = get_local_geocoder()
+    if local:
+        coords = local.geocode(address)
+        if coords:
+            return coords
+    
+    # A chave é sempre a canônica do endereço, independente da variante que resolveu
+    cache = get_geocode_cache()
+    key = canonical_key(address)
+    cached = cache.get(key)
+    if cached is not MISS:
+        return cached
+    
     try:
-        time.sleep(NOMINATIM_DELAY)
-        url = f"https://nominatim.openstreetmap.org/search?q={cleaned_address}, São Paulo, Brasil&format=json&limit=1"
-        headers = {"User-Agent": "DuoGourmetMetroFinder/1.0"}
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data:
-            return (float(data[0]["lat"]), float(data[0]["lon"]))
+        coords = query_nominatim(cleaned_address)
+        if coords:
+            cache.put(key, coords, "com_prefixos")
+            return coords
         
         # Se não encontrou, tenta novamente removendo os prefixos
         print("⚠️ Tentando novamente sem os prefixos...")
         cleaned_address = clean_address(address, try_with_prefixes=False)
-        if not cleaned_address:
-            return None
-            
-        time.sleep(NOMINATIM_DELAY)
-        url = f"https://nominatim.openstreetmap.org/search?q={cleaned_address}, São Paulo, Brasil&format=json&limit=1"
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data:
-            return (float(data[0]["lat"]), float(data[0]["lon"]))
+        if cleaned_address:
+            coords = query_nominatim(cleaned_address)
+            if coords:
+                cache.put(key, coords, "sem_prefixos")
+                return coords
         
         print(f"⚠️ Endereço não encontrado no Nominatim: '{cleaned_address}'")
+        cache.put(key, None)
         return None
         
     except Exception as e:
+        # Erros de rede não são gravados no cache para serem tentados de novo
         print(f"⚠️ Erro ao geocodificar com Nominatim: {e}")
         return None
 
-def find_nearest_station(lat, lon):
-    """Encontra a estação mais próxima usando cálculo de distância"""
+def station_result(station, distance):
+    """Monta o dicionário de estação devolvido pelas buscas"""
+    return {
+        "linha": station["linha"],
+        "nome": station["nome"],
+        "lat": station["lat"],
+        "lon": station["lon"],
+        "distance_haversine": distance
+    }
+
+def find_nearest_stations_bulk(points, k=1, max_distance=None):
+    """Encontra as k estações mais próximas de cada (lat, lon) de uma vez, com o kernel vetorizado
+    
+    Retorna uma lista alinhada com points, cada item com até k estações ordenadas pela distância.
+    """
     stations = load_stations()
-    if not stations or lat is None or lon is None:
-        return None
+    if not stations or not points:
+        return [[] for _ in points]
     
-    nearest = min(
-        stations,
-        key=lambda s: haversine_distance(lat, lon, s["lat"], s["lon"])
+    lats, lons = zip(*points)
+    indexes, distances = distance_matrix.top_k(
+        lats, lons,
+        stations.lats, stations.lons,
+        k=k
     )
-    distance = haversine_distance(lat, lon, nearest["lat"], nearest["lon"])
+    return [
+        [station_result(stations[i], float(d))
+         for i, d in zip(row_indexes, row_distances)
+         if max_distance is None or d <= max_distance]
+        for row_indexes, row_distances in zip(indexes, distances)
+    ]
+
+def find_candidate_stations(lat, lon, nearest_station):
+    """Lista as estações candidatas para o cálculo de rota a pé
     
-    return {
-        "linha": nearest["linha"],
-        "nome": nearest["nome"],
-        "lat": nearest["lat"],
-        "lon": nearest["lon"],
-        "distance_haversine": distance
-    }
+    Em linha reta, a mais próxima nem sempre é a de menor caminhada (rios, avenidas,
+    linhas de trem), então até CANDIDATE_STATIONS estações dentro de MAX_DISTANCE
+    são roteadas e a mais rápida vence.
+    """
+    if CANDIDATE_STATIONS <= 1:
+        return [nearest_station]
+    
+    return [
+        station_result(station, distance)
+        for distance, station in get_station_index().nearest(lat, lon, k=CANDIDATE_STATIONS, max_distance=MAX_DISTANCE)
+    ]
+
+def find_nearest_station(lat, lon):
+    """Encontra a estação mais próxima pela grade pré-calculada, pelo índice espacial ou pelo kernel vetorizado"""
+    if lat is None or lon is None:
+        return None
+    
+    if NEAREST_STATION_BACKEND == "numpy":
+        result = find_nearest_stations_bulk([(lat, lon)])[0]
+        return result[0] if result else None
+    
+    if NEAREST_STATION_BACKEND == "grid":
+        grid = get_station_grid()
+        found = grid.nearest(lat, lon) if grid else None
+        if found:
+            return station_result(found[1], found[0])
+        # Fora da grade (ou célula com candidatas demais): cai no índice espacial
+    
+    result = get_station_index().nearest(lat, lon)
+    if not result:
+        return None
+    distance, nearest = result[0]
+    
+    return station_result(nearest, distance)
 
 def make_google_api_request(url):
     """Faz requisições à API do Google com tratamento de erros e retentativas"""
     for attempt in range(MAX_RETRIES):
+        if attempt:
+            time.sleep(http_client.backoff_delay(attempt - 1))
         try:
-            time.sleep(GOOGLE_API_DELAY)
-            response = requests.get(url)
+            # As retentativas (inclusive por status da API) ficam por conta deste laço
+            response = http_client.get(url, max_retries=1)
             response.raise_for_status()
             data = response.json()
             
@@ -178,63 +330,81 @@ def make_google_api_request(url):
             if attempt == MAX_RETRIES - 1:
                 return None
 
-def get_walking_distance_google(origin_lat, origin_lon, dest_lat, dest_lon):
-    """Calcula distância e tempo a pé usando Google Routes API"""
-    url = "https://routes.googleapis.com/distanceMatrix/v2:computeRouteMatrix"
+def make_waypoint(lat, lon):
+    """Monta um waypoint da Routes API a partir de coordenadas"""
+    return {
+        "waypoint": {
+            "location": {
+                "latLng": {
+                    "latitude": lat,
+                    "longitude": lon
+                }
+            }
+        }
+    }
+
+def parse_route_matrix_response(text):
+    """Interpreta a resposta da computeRouteMatrix (array JSON ou elementos em stream)"""
+    text = text.strip()
+    if text.startswith('['):
+        return json.loads(text)
+    
+    # Em stream, os elementos chegam como objetos JSON concatenados
+    decoder = json.JSONDecoder()
+    elements = []
+    pos = 0
+    while pos < len(text):
+        element, pos = decoder.raw_decode(text, pos)
+        elements.append(element)
+        while pos < len(text) and text[pos] in ' \t\r\n,':
+            pos += 1
+    return elements
+
+def compute_route_matrix(origins, destinations):
+    """Calcula a matriz de rotas a pé entre listas de (lat, lon)
     
+    Retorna {(índice_origem, índice_destino): {'distance': metros, 'duration': minutos}}
+    apenas para os elementos que têm rota.
+    """
     headers = {
         'Content-Type': 'application/json',
         'X-Goog-Api-Key': GOOGLE_API_KEY,
-        'X-Goog-FieldMask': 'distanceMeters,duration,status'
+        'X-Goog-FieldMask': 'originIndex,destinationIndex,distanceMeters,duration,status'
     }
     
     payload = {
-        "origins": [{
-            "waypoint": {
-                "location": {
-                    "latLng": {
-                        "latitude": origin_lat,
-                        "longitude": origin_lon
-                    }
-                }
-            }
-        }],
-        "destinations": [{
-            "waypoint": {
-                "location": {
-                    "latLng": {
-                        "latitude": dest_lat,
-                        "longitude": dest_lon
-                    }
-                }
-            }
-        }],
+        "origins": [make_waypoint(lat, lon) for lat, lon in origins],
+        "destinations": [make_waypoint(lat, lon) for lat, lon in destinations],
         "travelMode": "WALK"
     }
     
+    response = http_client.post(ROUTES_URL, headers=headers, json=payload)
+    response.raise_for_status()  # Verifica erros HTTP
+    
+    results = {}
+    for element in parse_route_matrix_response(response.text):
+        if 'duration' not in element:
+            continue
+        # Campos com valor zero são omitidos no JSON da API (ex: originIndex 0)
+        index = (element.get('originIndex', 0), element.get('destinationIndex', 0))
+        # Converte duração (ex: "900s" → 15 minutos)
+        duration_seconds = float(element['duration'].rstrip('s'))
+        results[index] = {
+            'distance': element.get('distanceMeters', 0),
+            'duration': duration_seconds / 60  # Convertendo para minutos
+        }
+    return results
+
+def get_walking_distance_google(origin_lat, origin_lon, dest_lat, dest_lon):
+    """Calcula distância e tempo a pé usando Google Routes API"""
     try:
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()  # Verifica erros HTTP
-        data = response.json()
+        results = compute_route_matrix([(origin_lat, origin_lon)], [(dest_lat, dest_lon)])
         
-        if not data or not isinstance(data, list):
-            print("⚠️ Resposta inválida da API")
+        if (0, 0) not in results:
+            print("⚠️ Resposta sem rota entre restaurante e estação")
             return None
-            
-        first_result = data[0]
         
-        # Verifica se tem os campos necessários
-        if 'distanceMeters' not in first_result or 'duration' not in first_result:
-            print(f"⚠️ Dados incompletos. Resposta completa: {data}")
-            return None
-            
-        # Converte duração (ex: "900s" → 15 minutos)
-        duration_seconds = float(first_result['duration'].rstrip('s'))
-        
-        return {
-            'distance': first_result['distanceMeters'],
-            'duration': duration_seconds / 60  # Convertendo para minutos
-        }
+        return results[(0, 0)]
         
     except requests.exceptions.RequestException as e:
         print(f"🚨 Erro na requisição: {str(e)}")
@@ -243,6 +413,108 @@ def get_walking_distance_google(origin_lat, origin_lon, dest_lat, dest_lon):
         print(f"🔍 Erro ao processar resposta: {str(e)}")
         return None
 
+def get_walking_distances_google(origin_lat, origin_lon, stations):
+    """Calcula o trajeto a pé até várias estações numa única requisição (1 origem x N destinos)
+    
+    Retorna uma lista alinhada com stations (None onde não houver rota).
+    """
+    if len(stations) == 1:
+        return [get_walking_distance_google(origin_lat, origin_lon, stations[0]["lat"], stations[0]["lon"])]
+    
+    try:
+        results = compute_route_matrix(
+            [(origin_lat, origin_lon)],
+            [(station["lat"], station["lon"]) for station in stations]
+        )
+        return [results.get((0, i)) for i in range(len(stations))]
+        
+    except requests.exceptions.RequestException as e:
+        print(f"🚨 Erro na requisição: {str(e)}")
+    except (ValueError, KeyError, IndexError) as e:
+        print(f"🔍 Erro ao processar resposta: {str(e)}")
+    return [None] * len(stations)
+
+def plan_route_blocks(pairs):
+    """Agrupa os pares (origem, destino) em blocos de matriz com no máximo ROUTES_MAX_ELEMENTS
+    
+    Retorna uma lista de (origens, destinos), cada uma uma lista de (lat, lon). Restaurantes
+    com as mesmas estações candidatas dividem um bloco sem desperdício; blocos que dividem
+    estações são juntados enquanto a fração de elementos cobrados sem uso não passar de
+    ROUTES_MAX_WASTE. No pior caso sai um bloco 1 x k por restaurante; se agrupar só por
+    estação (colunas N x 1, sem desperdício) der menos requisições, fica esse plano.
+    """
+    destinations_by_origin = {}
+    for origin, destination in pairs:
+        destinations = destinations_by_origin.setdefault(origin, [])
+        if destination not in destinations:
+            destinations.append(destination)
+    
+    # Restaurantes com o mesmo conjunto de candidatas formam um bloco exato
+    exact = {}
+    for origin, destinations in destinations_by_origin.items():
+        exact.setdefault(frozenset(destinations), (destinations, []))[1].append(origin)
+    
+    blocks = []  # [origens, destinos, elementos usados]
+    for destinations, origins in sorted(exact.values(), key=lambda block: -len(block[0])):
+        per_block = max(ROUTES_MAX_ELEMENTS // len(destinations), 1)
+        for start in range(0, len(origins), per_block):
+            chunk = origins[start:start + per_block]
+            used = len(chunk) * len(destinations)
+            best = None
+            for block in blocks:
+                merged = block[1] + [d for d in destinations if d not in block[1]]
+                billed = (len(block[0]) + len(chunk)) * len(merged)
+                if billed > ROUTES_MAX_ELEMENTS or billed - block[2] - used > billed * ROUTES_MAX_WASTE:
+                    continue
+                if best is None or len(merged) < len(best[1]):
+                    best = (block, merged)
+            if best:
+                block, merged = best
+                block[0].extend(chunk)
+                block[1] = merged
+                block[2] += used
+            else:
+                blocks.append([list(chunk), list(destinations), used])
+    
+    origins_by_destination = {}
+    for origin, destinations in destinations_by_origin.items():
+        for destination in destinations:
+            origins_by_destination.setdefault(destination, []).append(origin)
+    columns = [(origins[start:start + ROUTES_MAX_ELEMENTS], [destination])
+               for destination, origins in origins_by_destination.items()
+               for start in range(0, len(origins), ROUTES_MAX_ELEMENTS)]
+    
+    if len(columns) < len(blocks):
+        return columns
+    return [(origins, destinations) for origins, destinations, _ in blocks]
+
+def get_walking_distances_batch(pairs):
+    """Calcula várias distâncias a pé agrupando os pares em poucas requisições de matriz
+    
+    Recebe uma lista de ((lat, lon) de origem, (lat, lon) de destino) e retorna uma lista
+    alinhada com os resultados (None quando não houver rota ou a requisição falhar).
+    Os blocos de cada requisição vêm do plan_route_blocks.
+    """
+    routes = {}
+    for origins, destinations in plan_route_blocks(pairs):
+        try:
+            matrix = compute_route_matrix(origins, destinations)
+        except requests.exceptions.RequestException as e:
+            print(f"🚨 Erro na requisição em lote: {str(e)}")
+            continue
+        except (ValueError, KeyError, IndexError) as e:
+            print(f"🔍 Erro ao processar resposta em lote: {str(e)}")
+            continue
+        for (origin_index, destination_index), walking_data in matrix.items():
+            routes[(origins[origin_index], destinations[destination_index])] = walking_data
+    
+    return [routes.get(pair) for pair in pairs]
+
+def get_existing_fieldnames():
+    """Retorna o cabeçalho do CSV existente (ou None)"""
+    with open(CSV_FILE, 'r', encoding='utf-8-sig') as f:
+        return csv.DictReader(f).fieldnames
+
 def get_existing_restaurants():
     """Retorna conjunto de URLs já processadas a partir do CSV existente"""
     existing = set()
@@ -253,31 +525,95 @@ def get_existing_restaurants():
                 existing.update(row['link'] for row in reader)
     return existing
 
-def get_restaurant_links():
-    """Obtém links dos restaurantes ordenados por nome, evitando duplicatas"""
-    try:
-        existing_urls = get_existing_restaurants()
-        response = requests.get(LIST_URL, headers=HEADERS)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+def read_existing_rows():
+    """Lê todas as linhas do CSV existente, na ordem do arquivo"""
+    if not os.path.exists(CSV_FILE):
+        return []
+    with open(CSV_FILE, 'r', encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+def use_lxml():
+    """Indica se o extrator direto com lxml deve ser usado"""
+    if HTML_PARSER == "auto":
+        return page_parser.available()
+    return HTML_PARSER == "lxml"
+
+def parse_listing(html):
+    """Extrai (nome, href) dos cards da listagem de restaurantes"""
+    href_prefix = urlparse(LIST_URL).path.rstrip("/") + "/"
+    if use_lxml():
+        return page_parser.extract_listing(html, href_prefix)
+    
+    soup = BeautifulSoup(html, "html.parser")
+    cards = []
+    for card in soup.select("div.restaurant-card"):
+        a_tag = card.select_one(f"a[href^='{href_prefix}']")
+        if a_tag:
+            title = card.select_one("h3")
+            cards.append((title.text if title else None, a_tag['href']))
+    return cards
+
+def parse_next_page(html):
+    """Retorna o href da próxima página da listagem (rel="next"), se houver"""
+    if use_lxml():
+        return page_parser.extract_next_page(html)
+    
+    soup = BeautifulSoup(html, "html.parser")
+    tag = soup.select_one("a[rel~=next][href], link[rel~=next][href]")
+    return tag['href'] if tag else None
+
+def iter_restaurant_links(exclude=()):
+    """Percorre a listagem página a página e gera cada restaurante assim que sua página é lida
+    
+    Segue o link rel="next" enquanto houver, sem repetir páginas nem restaurantes.
+    URLs em exclude (ex: já presentes no CSV) são puladas.
+    """
+    seen = set(exclude)
+    visited = set()
+    url = LIST_URL
+    while url and url not in visited and len(visited) < MAX_LISTING_PAGES:
+        visited.add(url)
+        with profiler.stage("listing"):
+            response = http_client.get(url, headers=HEADERS)
+            response.raise_for_status()
+            cards = parse_listing(response.text)
+            next_href = parse_next_page(response.text)
+        
+        for name, href in cards:
+            full_url = BASE_URL + href
+            if full_url in seen:
+                continue
+            seen.add(full_url)
+            yield {
+                "name": name.strip() if name is not None else "Sem Nome",
+                "link": full_url
+            }
         
-        restaurants = []
-        cards = soup.select("div.restaurant-card")
-        for card in cards:
-            a_tag = card.select_one("a[href^='/restaurantes/sao-paulo/']")
-            if a_tag:
-                name = card.select_one("h3").text.strip() if card.select_one("h3") else "Sem Nome"
-                full_url = BASE_URL + a_tag['href']
-                
-                if full_url not in existing_urls:
-                    restaurants.append({
-                        "name": name,
-                        "link": full_url
-                    })
+        url = urljoin(url, next_href) if next_href else None
+
+def stream_restaurant_links(exclude=()):
+    """Gera os primeiros MAX_RESTAURANTS restaurantes novos na ordem da listagem, sem esperar o fim dela"""
+    try:
+        yield from islice(iter_restaurant_links(exclude), MAX_RESTAURANTS)
+    except Exception as e:
+        print(f"⚠️ Erro ao buscar links de restaurantes: {e}")
+
+def get_restaurant_links(include_existing=False, exclude=None):
+    """Obtém links dos restaurantes ordenados por nome, evitando duplicatas
+    
+    Com include_existing=True devolve a listagem completa, sem filtrar o CSV nem limitar.
+    exclude substitui o conjunto de URLs já processadas (por padrão, as do CSV).
+    """
+    try:
+        if include_existing:
+            existing_urls = set()
+        else:
+            existing_urls = exclude if exclude is not None else get_existing_restaurants()
+        restaurants = list(iter_restaurant_links(existing_urls))
         
         # Ordena e limita o número de restaurantes
         restaurants.sort(key=lambda x: x['name'].lower())
-        return restaurants[:MAX_RESTAURANTS]
+        return restaurants if include_existing else restaurants[:MAX_RESTAURANTS]
     
     except Exception as e:
         print(f"⚠️ Erro ao buscar links de restaurantes: {e}")
@@ -297,82 +633,477 @@ def parse_calendar(soup):
         almoco_cells = rows[0].find_all("td")[1:]
         jantar_cells = rows[1].find_all("td")[1:]
 
-        almoco = ["X" if "check.png" in str(cell) else "" for cell in almoco_cells]
-        jantar = ["X" if "check.png" in str(cell) else "" for cell in jantar_cells]
+        # Procura o ícone pelo src em vez de serializar cada célula com str()
+        almoco = ["X" if cell.find(src=CHECK_ICON) else "" for cell in almoco_cells]
+        jantar = ["X" if cell.find(src=CHECK_ICON) else "" for cell in jantar_cells]
 
     return almoco, jantar
 
-def scrape_restaurant_info(url):
-    """Coleta informações do restaurante com dados do metro"""
-    try:
-        res = requests.get(url, headers=HEADERS)
-        res.raise_for_status()
-        soup = BeautifulSoup(res.text, "html.parser")
-
-        # Informações básicas do restaurante
-        name = soup.select_one("h1").text.strip() if soup.select_one("h1") else "N/A"
-        address_tag = soup.select_one("h4:has(img[src*='flat-pin']) + address p")
-        address = address_tag.text.strip().replace("\n", ", ") if address_tag else "N/A"
-        address = re.sub(r"(,?)\s*São Paulo$", r"\1 São Paulo", address)
-        contato_tag = soup.select_one("h4:has(img[src*='phone']) + p")
-        contato = contato_tag.text.strip() if contato_tag else "N/A"
-        cozinha_tag = soup.select_one("h4:has(img[src*='chef']) + p")
-        cozinha = cozinha_tag.text.strip() if cozinha_tag else "N/A"
-        almoco, jantar = parse_calendar(soup)
-
-        # Dados do metrô (inicialmente vazios)
-        metro_data = {
-            "Linha": "N/A",
-            "Estacao": "N/A",
-            "Distancia": "N/A",
-            "Tempo": "N/A",
-            "Distancia_reta": "N/A"
-        }
+def estimate_walks(candidates):
+    """Estima localmente a caminhada até a estação, ou None se não for confiável
+    
+    Com mais de uma candidata a escolha depende de diferenças de poucos minutos, que a
+    estimativa não separa: a Google decide.
+    """
+    if not WALK_ESTIMATOR:
+        return None
+    
+    estimator = get_walk_estimator()
+    if len(candidates) > 1:
+        estimator.record(False)
+        return None
+    estimates = [estimator.estimate(station["nome"], station["distance_haversine"]) for station in candidates]
+    confident = all(estimate and estimate["confidence"] >= WALK_CONFIDENCE for estimate in estimates)
+    estimator.record(confident)
+    return estimates if confident else None
 
-        if address != "N/A":
-            # Usa Nominatim para geocodificação
-            coords = get_coordinates_nominatim(address)
-            if coords:
-                lat, lng = coords
-                
-                # Encontra a estação mais próxima pelo cálculo de distância
-                nearest_station = find_nearest_station(lat, lng)
-                if nearest_station:
-                    metro_data["Distancia_reta"] = f"{nearest_station['distance_haversine']:.0f}"
-                    
-                    # Verifica se a distância está dentro do limite aceitável
-                    if nearest_station['distance_haversine'] <= MAX_DISTANCE:
-                        # Usa Google para cálculo preciso de distância/tempo
-                        walking_data = get_walking_distance_google(
-                            lat, lng,
-                            nearest_station["lat"], nearest_station["lon"]
-                        )
-                        
-                        if walking_data:
-                            metro_data.update({
-                                "Linha": nearest_station["linha"],
-                                "Estacao": nearest_station["nome"],
-                                "Distancia": f"{walking_data['distance']:.0f}",
-                                "Tempo": f"{walking_data['duration']:.1f}"
-                            })
-                    else:
-                        print(f"   Estação mais próxima está a {nearest_station['distance_haversine']:.0f}m (acima do limite de {MAX_DISTANCE}m)")
-
-        return {
-            "nome": name,
-            "endereco": address,
-            "contato": contato,
-            "cozinha": cozinha,
-            "link": url,
-            **metro_data,
-            **{f"almoco_{day}": almoco[i] for i, day in enumerate(DAYS)},
-            **{f"jantar_{day}": jantar[i] for i, day in enumerate(DAYS)},
-        }
+def apply_route_choice(row, candidates, walking_results, source="google"):
+    """Preenche os campos de metrô com a estação de menor tempo a pé entre as candidatas
+    
+    source ("google" ou "estimativa") vai para a coluna Fonte.
+    """
+    routed = sorted(
+        ((walking_data, station) for walking_data, station in zip(walking_results, candidates) if walking_data),
+        key=lambda item: item[0]['duration']
+    )
+    if not routed:
+        return
+    
+    walking_data, station = routed[0]
+    row.update({
+        "Linha": station["linha"],
+        "Estacao": station["nome"],
+        "Distancia": f"{walking_data['distance']:.0f}",
+        "Tempo": f"{walking_data['duration']:.1f}",
+        "Distancia_reta": f"{station['distance_haversine']:.0f}",
+        "Fonte": source
+    })
+    
+    if RECORD_RUNNER_UP and len(routed) > 1:
+        walking_data, station = routed[1]
+        row.update({
+            "Linha_2": station["linha"],
+            "Estacao_2": station["nome"],
+            "Distancia_2": f"{walking_data['distance']:.0f}",
+            "Tempo_2": f"{walking_data['duration']:.1f}"
+        })
+
+def route_pending_rows(rows):
+    """Calcula em lote as rotas a pé das linhas coletadas com route=False"""
+    pending = [row for row in rows if row.get("_rota")]
+    pairs = [((lat, lng), (station["lat"], station["lon"]))
+             for lat, lng, candidates in (row["_rota"] for row in pending)
+             for station in candidates]
+    with profiler.stage("route_batch"):
+        results = get_walking_distances_batch(pairs)
+    
+    # Cada linha consome tantos resultados quantas forem suas estações candidatas
+    position = 0
+    for row in pending:
+        candidates = row["_rota"][2]
+        apply_route_choice(row, candidates, results[position:position + len(candidates)])
+        position += len(candidates)
+    
+    for row in rows:
+        row.pop("_rota", None)
+
+def extract_restaurant_soup(html):
+    """Extrai os textos crus da página com BeautifulSoup (backend de reserva do page_parser)"""
+    soup = BeautifulSoup(html, "html.parser")
+
+    name_tag = soup.select_one("h1")
+    address_tag = soup.select_one("h4:has(img[src*='flat-pin']) + address p")
+    contato_tag = soup.select_one("h4:has(img[src*='phone']) + p")
+    cozinha_tag = soup.select_one("h4:has(img[src*='chef']) + p")
+    almoco, jantar = parse_calendar(soup)
+
+    return {
+        "nome": name_tag.text if name_tag else None,
+        "endereco": address_tag.text if address_tag else None,
+        "contato": contato_tag.text if contato_tag else None,
+        "cozinha": cozinha_tag.text if cozinha_tag else None,
+        "almoco": almoco,
+        "jantar": jantar,
+    }
+
+def parse_restaurant_page(html):
+    """Extrai nome, endereço, contato, cozinha e horários da página de um restaurante"""
+    raw = page_parser.extract_restaurant(html) if use_lxml() else extract_restaurant_soup(html)
+
+    name = raw["nome"].strip() if raw["nome"] is not None else "N/A"
+    address = raw["endereco"].strip().replace("\n", ", ") if raw["endereco"] is not None else "N/A"
+    address = re.sub(rf"(,?)\s*{re.escape(CITY_NAME)}$", rf"\1 {CITY_NAME}", address)
+    contato = raw["contato"].strip() if raw["contato"] is not None else "N/A"
+    cozinha = raw["cozinha"].strip() if raw["cozinha"] is not None else "N/A"
+    almoco, jantar = raw["almoco"], raw["jantar"]
+
+    return {
+        "nome": name,
+        "endereco": address,
+        "contato": contato,
+        "cozinha": cozinha,
+        **{f"almoco_{day}": almoco[i] for i, day in enumerate(DAYS)},
+        **{f"jantar_{day}": jantar[i] for i, day in enumerate(DAYS)},
+    }
+
+def lookup_coordinates(address):
+    """Geocodifica o endereço do restaurante (None se não houver endereço ou não for encontrado)"""
+    if address == "N/A":
+        return None
+    # Usa Nominatim para geocodificação
+    with profiler.stage("geocode"):
+        return get_coordinates_nominatim(address)
+
+def metro_from_coordinates(coords, route=True):
+    """Encontra a estação e a rota a pé a partir das coordenadas do restaurante
+    
+    Retorna (campos de metrô, rota pendente); a rota pendente só existe com route=False.
+    """
+    pending_route = None
+    metro_data = {
+        "Linha": "N/A",
+        "Estacao": "N/A",
+        "Distancia": "N/A",
+        "Tempo": "N/A",
+        "Distancia_reta": "N/A",
+        "Fonte": "N/A"
+    }
+
+    if coords:
+        lat, lng = coords
+        
+        # Encontra a estação mais próxima pelo cálculo de distância
+        with profiler.stage("nearest_station"):
+            nearest_station = find_nearest_station(lat, lng)
+        if nearest_station:
+            metro_data["Distancia_reta"] = f"{nearest_station['distance_haversine']:.0f}"
+            
+            # Verifica se a distância está dentro do limite aceitável
+            if nearest_station['distance_haversine'] <= MAX_DISTANCE:
+                with profiler.stage("candidate_stations"):
+                    candidates = find_candidate_stations(lat, lng, nearest_station)
+                with profiler.stage("estimate"):
+                    estimates = estimate_walks(candidates)
+                if estimates:
+                    # Caminhada previsível: dispensa a chamada paga à Routes API
+                    apply_route_choice(metro_data, candidates, estimates, source="estimativa")
+                elif route:
+                    # Usa Google para cálculo preciso de distância/tempo
+                    with profiler.stage("route"):
+                        walking_results = get_walking_distances_google(lat, lng, candidates)
+                    apply_route_choice(metro_data, candidates, walking_results)
+                else:
+                    pending_route = (lat, lng, candidates)
+            else:
+                print(f"   Estação mais próxima está a {nearest_station['distance_haversine']:.0f}m (acima do limite de {MAX_DISTANCE}m)")
+
+    return metro_data, pending_route
+
+def lookup_metro(address, route=True):
+    """Geocodifica o endereço e encontra a estação e a rota a pé"""
+    return metro_from_coordinates(lookup_coordinates(address), route)
+
+def route_failed(row):
+    """Indica se havia estação dentro de MAX_DISTANCE mas a rota a pé não foi obtida"""
+    if row["Estacao"] != "N/A" or row["Distancia_reta"] == "N/A":
+        return False
+    return float(row["Distancia_reta"]) <= MAX_DISTANCE
+
+def journal_row(url, row):
+    """Registra no diário a linha final de um restaurante (completa ou não)"""
+    if route_failed(row):
+        get_journal().record_row(url, row, complete=False, error="rota a pé não obtida")
+    else:
+        get_journal().record_row(url, row, complete=True)
+
+def build_row(url, info, metro_data, pending_route=None):
+    """Monta a linha do CSV na ordem das colunas"""
+    row = {
+        "nome": info["nome"],
+        "endereco": info["endereco"],
+        "contato": info["contato"],
+        "cozinha": info["cozinha"],
+        "link": url,
+        **metro_data,
+        **{field: info[field] for field in SCHEDULE_FIELDS},
+    }
+    if pending_route:
+        row["_rota"] = pending_route
+    return row
+
+def scrape_restaurant_info(url, route=True):
+    """Coleta informações do restaurante com dados do metro
+    
+    Cada etapa (página, geocodificação, rota) fica registrada no diário, e uma nova
+    tentativa retoma da primeira etapa que faltou. Com route=False a rota a pé não é
+    calculada: a linha volta com a chave "_rota" para ser resolvida depois, em lote,
+    por route_pending_rows.
+    """
+    journal = get_journal()
+    entry = journal.get(url) or {}
+    try:
+        if entry.get("stage") == "routed":
+            # Linha completa que ainda não chegou ao CSV
+            return entry["row"]
+        
+        info = entry.get("info")
+        if info is None:
+            with profiler.stage("fetch"):
+                res = http_client.get(url, headers=HEADERS)
+                res.raise_for_status()
+            with profiler.stage("parse"):
+                info = parse_restaurant_page(res.text)
+            journal.record_fetched(url, info)
+            
+            # Guarda os validadores da página para o modo incremental
+            get_page_state().save(url, res, content_hash(res.text), info["endereco"])
+        
+        if entry.get("stage") == "geocoded":
+            coords = entry["coords"]
+        else:
+            coords = lookup_coordinates(info["endereco"])
+            if coords or info["endereco"] == "N/A":
+                journal.record_geocoded(url, coords)
+        
+        metro_data, pending_route = metro_from_coordinates(coords, route)
+        row = build_row(url, info, metro_data, pending_route)
+        if not pending_route:
+            if coords is None and info["endereco"] != "N/A":
+                journal.record_row(url, row, complete=False, error="endereço não geocodificado")
+            else:
+                journal_row(url, row)
+        return row
 
     except Exception as e:
         print(f"⚠️ Erro ao processar {url}: {e}")
+        journal.record_failure(url, str(e))
         return None
 
+def refresh_restaurant(url, old_row, route=True):
+    """Revalida um restaurante que já está no CSV usando GET condicional
+    
+    Retorna (situação, linha): "nao_modificado", "atualizado" ou "falha" (mantém a linha antiga).
+    Só geocodifica e roteia de novo se o endereço mudou.
+    """
+    try:
+        state = get_page_state()
+        with profiler.stage("fetch"):
+            res = http_client.get(url, headers={**HEADERS, **state.conditional_headers(url)})
+        if res.status_code == 304:
+            state.touch(url, res)
+            return "nao_modificado", old_row
+        res.raise_for_status()
+        
+        text_hash = content_hash(res.text)
+        saved = state.get(url)
+        if saved and saved["content_hash"] == text_hash:
+            state.touch(url, res)
+            return "nao_modificado", old_row
+        
+        with profiler.stage("parse"):
+            info = parse_restaurant_page(res.text)
+        if info["endereco"] == old_row.get("endereco"):
+            # Mesmo endereço: mantém os dados de metrô já calculados
+            row = {**old_row, **info}
+        else:
+            metro_data, pending_route = lookup_metro(info["endereco"], route)
+            row = build_row(url, info, metro_data, pending_route)
+        row["delistado"] = ""
+        state.save(url, res, text_hash, info["endereco"])
+        
+        changed = any(row.get(field, "") != old_row.get(field, "") for field in row if not field.startswith("_"))
+        return ("atualizado" if changed else "nao_modificado"), row
+
+    except Exception as e:
+        print(f"⚠️ Erro ao revalidar {url}: {e}")
+        return "falha", old_row
+
+def report_restaurant(i, total, url, data):
+    """Mostra no terminal o resultado do processamento de um restaurante"""
+    print(f"\nProcessado {i}/{total}: {url}" if total is not None else f"\nProcessado {i}: {url}")
+    
+    if data:
+        print(f"✅ {data['nome']}")
+        print(f"   Endereço: {data['endereco']}")
+        if data['Estacao'] != "N/A":
+            print(f"   Estação mais próxima: {data['Estacao']} ({data['Linha']})")
+            print(f"   Distância em linha reta: {data['Distancia_reta']}m")
+            if data['Distancia'] != "N/A":
+                print(f"   Distância a pé: {data['Distancia']}m (~{data['Tempo']} min)")
+        elif data['Distancia_reta'] != "N/A":
+            print(f"   Estação mais próxima está a {data['Distancia_reta']}m (acima do limite de {MAX_DISTANCE}m)")
+    else:
+        print(f"⚠️ Falha ao processar restaurante {i}")
+
+DEFAULT_FIELDNAMES = ["nome", "endereco", "contato", "cozinha", "link",
+                      "Linha", "Estacao", "Distancia", "Tempo", "Distancia_reta", "Fonte"] + SCHEDULE_FIELDS
+RUNNER_UP_FIELDS = ["Linha_2", "Estacao_2", "Distancia_2", "Tempo_2"]
+
+def output_fieldnames(existing_rows):
+    """Colunas do CSV: as do arquivo atual (ou as padrão) mais as colunas novas que faltarem"""
+    fieldnames = (get_existing_fieldnames() if existing_rows else None) or DEFAULT_FIELDNAMES.copy()
+    extra = ["Fonte"] + (RUNNER_UP_FIELDS if RECORD_RUNNER_UP else [])
+    return fieldnames + [field for field in extra if field not in fieldnames]
+
+def close_stores():
+    """Mostra as estatísticas e fecha os arquivos SQLite abertos na execução
+    
+    Os globais voltam a None para que uma nova execução no mesmo processo abra tudo de novo.
+    """
+    global geocode_cache, local_geocoder, walk_estimator, page_state, journal
+    profile = profiler.write_profile(
+        PROFILE,
+        http=http_client.snapshot(),
+        geocode_cache=dict(geocode_cache.stats) if geocode_cache is not None else None,
+        local_geocoder=dict(local_geocoder.stats) if local_geocoder else None,
+        walk_estimator=dict(walk_estimator.stats) if walk_estimator is not None else None
+    )
+    print(f"\n⏱️ Perfil da execução (salvo em {PROFILE}):")
+    for line in profiler.summary_lines(profile):
+        print(f"   {line}")
+    for line in http_client.summary():
+        print(f"🌐 {line}")
+    if geocode_cache is not None:
+        print(f"🗺️ Cache de geocodificação: {geocode_cache.summary()}")
+        geocode_cache.close()
+    if local_geocoder:
+        print(f"🧭 Geocodificador local: {local_geocoder.summary()}")
+        local_geocoder.close()
+    if walk_estimator is not None:
+        print(f"🚶 Estimador de caminhada: {walk_estimator.summary()}")
+    if page_state is not None:
+        page_state.close()
+    if journal is not None:
+        journal.close()
+    geocode_cache = local_geocoder = walk_estimator = page_state = journal = None
+
+def refresh_csv():
+    """Modo incremental: revalida as páginas já no CSV, acrescenta as novas e marca as descontinuadas
+    
+    O CSV é reescrito por inteiro, com as linhas antigas atualizadas no lugar e as novas no final.
+    """
+    print("\nColetando a listagem completa de restaurantes...")
+    listed = get_restaurant_links(include_existing=True)
+    if not listed:
+        # Sem listagem não dá pra distinguir restaurante descontinuado de falha de rede
+        print("❌ Listagem vazia, nada será atualizado.")
+        return
+    
+    old_rows = read_existing_rows()
+    old_by_link = {row['link']: row for row in old_rows}
+    listed_links = {restaurant['link'] for restaurant in listed}
+    new_links = [r['link'] for r in listed if r['link'] not in old_by_link][:MAX_RESTAURANTS]
+    to_refresh = [row for row in old_rows if row['link'] in listed_links]
+    print(f"{len(to_refresh)} restaurantes serão revalidados e {len(new_links)} novos processados.\n")
+    
+    batch_routes = ROUTES_BATCH_SIZE > 0
+    counts = {"nao_modificado": 0, "atualizado": 0, "novo": 0, "delistado": 0, "falha": 0}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        refreshed = list(executor.map(
+            lambda row: refresh_restaurant(row['link'], row, route=not batch_routes), to_refresh
+        ))
+        scraped = list(executor.map(lambda url: scrape_restaurant_info(url, route=not batch_routes), new_links))
+    
+    updated_by_link = {}
+    for status, row in refreshed:
+        counts[status] += 1
+        updated_by_link[row['link']] = row
+    
+    rows = []
+    for old_row in old_rows:
+        row = updated_by_link.get(old_row['link'], old_row)
+        if old_row['link'] in listed_links:
+            row["delistado"] = ""
+        else:
+            row = {**row, "delistado": "X"}
+            counts["delistado"] += 1
+        rows.append(row)
+    for url, data in zip(new_links, scraped):
+        if data:
+            counts["novo"] += 1
+            rows.append({**data, "delistado": ""})
+        else:
+            counts["falha"] += 1
+            print(f"⚠️ Falha ao processar restaurante novo {url}")
+    
+    if batch_routes:
+        # Só os novos passaram pelo diário; as linhas revalidadas não têm entrada nele
+        pending = [row for row in rows if row.get("_rota") and row['link'] not in old_by_link]
+        route_pending_rows(rows)
+        for row in pending:
+            journal_row(row["link"], row)
+    
+    fieldnames = output_fieldnames(old_rows)
+    if "delistado" not in fieldnames:
+        fieldnames.append("delistado")
+    write_outputs(rows, fieldnames)
+    get_journal().mark_written(row['link'] for row in rows)
+    for status, total in counts.items():
+        profiler.count(status, total)
+    
+    print(f"✅ Concluído! {counts['nao_modificado']} sem mudanças, {counts['atualizado']} atualizados, "
+          f"{counts['novo']} novos, {counts['delistado']} descontinuados, {counts['falha']} falhas. "
+          f"Dados salvos em {CSV_FILE}")
+
+def scrape_in_order(urls, route=True):
+    """Processa os restaurantes em paralelo e gera (posição, url, linha) na ordem de entrada
+    
+    urls pode ser um gerador: cada URL é enviada aos workers assim que chega, e os
+    resultados prontos são devolvidos em ordem, mantendo o CSV determinístico.
+    """
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for i, url in enumerate(urls, 1):
+            pending.append((i, url, executor.submit(scrape_restaurant_info, url, route)))
+            while pending and pending[0][2].done():
+                index, done_url, future = pending.popleft()
+                yield index, done_url, future.result()
+        while pending:
+            index, done_url, future = pending.popleft()
+            yield index, done_url, future.result()
+
+def finish_batch(batch, total, batch_routes, rows_by_url):
+    """Resolve as rotas pendentes do lote (se houver) e guarda as linhas prontas"""
+    if batch_routes:
+        rows = [data for _, _, data in batch if data]
+        pending = [row for row in rows if row.get("_rota")]
+        route_pending_rows(rows)
+        for row in pending:
+            journal_row(row["link"], row)
+    for index, url, data in batch:
+        if data:
+            rows_by_url[url] = data
+        profiler.count("restaurantes" if data else "falhas")
+        report_restaurant(index, total, url, data)
+
+def write_csv_atomic(rows, fieldnames):
+    """Grava o CSV num arquivo temporário e troca de uma vez, para nunca deixar o arquivo pela metade"""
+    temp_file = CSV_FILE + ".tmp"
+    with open(temp_file, "w", newline='', encoding='utf-8-sig') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+        csvfile.flush()
+        os.fsync(csvfile.fileno())
+    os.replace(temp_file, CSV_FILE)
+
+def write_outputs(rows, fieldnames):
+    """Grava o CSV e as saídas tipadas pedidas em OUTPUT_FORMATS, com o mesmo nome base"""
+    with profiler.stage("csv_write"):
+        write_csv_atomic(rows, fieldnames)
+    base = os.path.splitext(CSV_FILE)[0]
+    if "sqlite" in OUTPUT_FORMATS:
+        with profiler.stage("sqlite_write"):
+            output_writers.write_sqlite(rows, base + ".sqlite")
+        print(f"🗃️ Banco SQLite salvo em {base}.sqlite")
+    if "parquet" in OUTPUT_FORMATS:
+        with profiler.stage("parquet_write"):
+            written = output_writers.write_parquet(rows, base + ".parquet")
+        if written:
+            print(f"🗃️ Arquivo Parquet salvo em {base}.parquet")
+        else:
+            print("⚠️ Saída Parquet ignorada: instale o pyarrow para gerá-la")
+
 def main():
     if GOOGLE_API_KEY == "SUA_CHAVE_DE_API_AQUI":
         print("❌ Erro: Você precisa configurar sua API Key do Google Maps")
@@ -380,48 +1111,55 @@ def main():
         print("Depois, habilite a Distance Matrix API")
         return
 
-    print("\nColetando links de restaurantes...")
-    restaurants = get_restaurant_links()
-    print(f"{len(restaurants)} novos restaurantes serão processados (ordenados alfabeticamente, limite: {MAX_RESTAURANTS}).\n")
+    profiler.reset()
+    http_client.reset_stats()
+    if REFRESH:
+        refresh_csv()
+        close_stores()
+        return
 
-    fieldnames = ["nome", "endereco", "contato", "cozinha", "link",
-                 "Linha", "Estacao", "Distancia", "Tempo", "Distancia_reta"] + \
-                [f"almoco_{d}" for d in DAYS] + [f"jantar_{d}" for d in DAYS]
+    existing_rows = read_existing_rows()
+    journal = get_journal()
+    # Restaurantes de execuções anteriores que falharam ou não chegaram ao CSV
+    resumed = journal.pending(JOURNAL_MAX_ATTEMPTS)
+    # Os que esgotaram as tentativas entram com a linha parcial (ex: metrô "N/A"), sem nova coleta
+    existing_links = {row['link'] for row in existing_rows}
+    exhausted = {url: row for url, row in journal.exhausted(JOURNAL_MAX_ATTEMPTS).items()
+                 if url not in existing_links}
+    # Inclui as que falharam antes de ter linha (página fora do ar), senão voltariam como novas
+    skip = existing_links | set(resumed) | journal.given_up(JOURNAL_MAX_ATTEMPTS)
+    if resumed:
+        print(f"\n🔁 {len(resumed)} restaurantes serão retomados do diário de execução.")
 
-    # Verifica se o arquivo existe para determinar se precisa escrever o cabeçalho
-    file_exists = os.path.isfile(CSV_FILE)
-    
-    with open(CSV_FILE, "a", newline='', encoding='utf-8-sig') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        # Escreve o cabeçalho apenas se o arquivo não existia
-        if not file_exists:
-            writer.writeheader()
+    print("\nColetando links de restaurantes...")
+    if STREAM_LISTING:
+        # Os restaurantes entram na fila assim que cada página da listagem é lida
+        restaurants = stream_restaurant_links(skip)
+        total = None
+        print(f"Novos restaurantes serão processados na ordem da listagem (limite: {MAX_RESTAURANTS}).\n")
+    else:
+        restaurants = get_restaurant_links(exclude=skip)
+        total = len(resumed) + len(restaurants)
+        print(f"{len(restaurants)} novos restaurantes serão processados (ordenados alfabeticamente, limite: {MAX_RESTAURANTS}).\n")
 
-        for i, restaurant in enumerate(restaurants, 1):
-            url = restaurant['link']
-            
-            print(f"\nProcessando {i}/{len(restaurants)}: {url}")
-            data = scrape_restaurant_info(url)
-            
-            if data:
-                writer.writerow(data)  # Grava imediatamente no CSV
-                csvfile.flush()  # Força a escrita no disco
-                
-                print(f"✅ {data['nome']}")
-                print(f"   Endereço: {data['endereco']}")
-                if data['Estacao'] != "N/A":
-                    print(f"   Estação mais próxima: {data['Estacao']} ({data['Linha']})")
-                    print(f"   Distância em linha reta: {data['Distancia_reta']}m")
-                    if data['Distancia'] != "N/A":
-                        print(f"   Distância a pé: {data['Distancia']}m (~{data['Tempo']} min)")
-                elif data['Distancia_reta'] != "N/A":
-                    print(f"   Estação mais próxima está a {data['Distancia_reta']}m (acima do limite de {MAX_DISTANCE}m)")
-            else:
-                print(f"⚠️ Falha ao processar restaurante {i}")
+    batch_routes = ROUTES_BATCH_SIZE > 0
+    batch = []
+    rows_by_url = dict(exhausted)
+    urls = chain(resumed, (restaurant['link'] for restaurant in restaurants))
+    for i, url, data in scrape_in_order(urls, route=not batch_routes):
+        batch.append((i, url, data))
+        if len(batch) >= max(ROUTES_BATCH_SIZE, 1):
+            finish_batch(batch, total, batch_routes, rows_by_url)
+            batch = []
+    finish_batch(batch, total, batch_routes, rows_by_url)
+
+    # Linhas já existentes são atualizadas no lugar; as novas vão para o final
+    rows = [rows_by_url.pop(row['link'], row) for row in existing_rows] + list(rows_by_url.values())
+    write_outputs(rows, output_fieldnames(existing_rows))
+    journal.mark_written(row['link'] for row in rows)
 
-            time.sleep(REQUESTS_DELAY)
     print(f"\n✅ Concluído! Dados salvos em {CSV_FILE}")
+    close_stores()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,81 @@
+"""Cronômetros por etapa e contadores da execução, para o relatório de perfil
+
+As etapas podem rodar em várias threads ao mesmo tempo: o tempo de cada etapa é a soma
+das durações em todas as threads, e o tempo de parede da execução vem à parte.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+lock = threading.Lock()
+stages = {}  # etapa -> {"count", "total", "max"}
+counters = {}
+started_at = time.time()
+started = time.perf_counter()
+
+
+@contextmanager
+def stage(name):
+    """Cronometra o bloco como uma ocorrência da etapa"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(name, time.perf_counter() - start)
+
+
+def add_time(name, seconds):
+    with lock:
+        entry = stages.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+        entry["count"] += 1
+        entry["total"] += seconds
+        entry["max"] = max(entry["max"], seconds)
+
+
+def count(name, n=1):
+    with lock:
+        counters[name] = counters.get(name, 0) + n
+
+
+def reset():
+    """Zera os cronômetros (nova execução no mesmo processo)"""
+    global started_at, started
+    with lock:
+        stages.clear()
+        counters.clear()
+        started_at = time.time()
+        started = time.perf_counter()
+
+
+def snapshot():
+    """Cópia dos cronômetros e contadores, pronta para virar JSON"""
+    with lock:
+        return {
+            "started_at": started_at,
+            "wall_seconds": time.perf_counter() - started,
+            "stages": {name: dict(entry) for name, entry in stages.items()},
+            "counters": dict(counters),
+        }
+
+
+def summary_lines(profile):
+    """Tabela legível com as etapas do perfil, da mais demorada para a mais rápida"""
+    lines = [f"{'etapa':<16} {'vezes':>6} {'total (s)':>10} {'média (ms)':>11} {'máx. (ms)':>10}"]
+    for name, entry in sorted(profile["stages"].items(), key=lambda item: -item[1]["total"]):
+        average = entry["total"] / entry["count"] * 1000 if entry["count"] else 0
+        lines.append(f"{name:<16} {entry['count']:>6} {entry['total']:>10.2f} {average:>11.1f} "
+                     f"{entry['max'] * 1000:>10.1f}")
+    lines.append(f"{'parede':<16} {'':>6} {profile['wall_seconds']:>10.2f}")
+    return lines
+
+
+def write_profile(path, **sections):
+    """Grava o perfil da execução em JSON (mais seções extras, ex: estatísticas HTTP)"""
+    profile = {**snapshot(), **sections}
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+    return profile
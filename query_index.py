@@ -0,0 +1,171 @@
+"""Índice de consultas sobre o CSV: "almoço na terça perto da Linha 2" em milissegundos
+
+Os horários de cada restaurante viram uma máscara de 14 bits (bits 0-6 = almoço de domingo a
+sábado, bits 7-13 = jantar). Os restaurantes são numerados pela ordem do tempo a pé, e cada
+linha, estação, cozinha, cidade e bit de horário guarda um conjunto de bits (um int do Python)
+com os restaurantes que o têm. Um filtro combinado é só um "&" entre esses inteiros, e os
+bits ligados já saem na ordem do menor tempo a pé.
+
+Uso: python query_index.py --dia ter --refeicao almoco --linha 2 [--csv arquivo.csv ...]
+"""
+import argparse
+import csv
+import math
+import time
+
+from address import normalize_key
+from output_writers import DAYS, parse_number, schedule_mask
+
+MEALS = ["almoco", "jantar"]
+DEFAULT_CSV = "restaurantes_com_metro_google.csv"
+# Campo do CSV -> nome do filtro
+INDEXED_FIELDS = {"Linha": "line", "Estacao": "station", "cozinha": "cuisine", "cidade": "city"}
+# Filtros em que basta o valor conter as palavras buscadas ("2" acha "2-Verde")
+PARTIAL_FILTERS = {"line", "cuisine"}
+BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+def availability_mask(row):
+    """Empacota as 14 colunas de horário: almoço nos bits 0-6, jantar nos bits 7-13"""
+    return schedule_mask(row, "almoco") | schedule_mask(row, "jantar") << 7
+
+
+def schedule_bits(day=None, meal=None):
+    """Bits da máscara que atendem ao dia e/ou à refeição pedidos"""
+    days = [DAYS.index(day)] if day else range(7)
+    meals = [MEALS.index(meal)] if meal else range(2)
+    return [m * 7 + d for m in meals for d in days]
+
+
+def to_bitset(ids, size):
+    """Conjunto de bits com as posições de ids ligadas (montado em bytes, de uma vez só)"""
+    data = bytearray(size // 8 + 1)
+    for i in ids:
+        data[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(data, "little")
+
+
+def iter_bits(bits, size):
+    """Posições dos bits ligados, da menor para a maior, varrendo byte a byte"""
+    for offset, byte in enumerate(bits.to_bytes(size // 8 + 1, "little")):
+        if byte:
+            for bit in BYTE_BITS[byte]:
+                yield offset * 8 + bit
+
+
+def read_rows(paths):
+    rows = []
+    for path in paths:
+        with open(path, encoding="utf-8-sig") as csvfile:
+            rows.extend(csv.DictReader(csvfile))
+    return rows
+
+
+class RestaurantIndex:
+    """Índices invertidos por linha, estação, cozinha, cidade e bit de horário"""
+
+    def __init__(self, rows):
+        def walking_time(row):
+            minutes = parse_number(row.get("Tempo"))
+            distance = parse_number(row.get("Distancia")) or parse_number(row.get("Distancia_reta"))
+            return (minutes if minutes is not None else math.inf, distance if distance is not None else math.inf)
+
+        self.rows = sorted(rows, key=walking_time)
+        self.times = [walking_time(row)[0] for row in self.rows]
+        self.masks = [availability_mask(row) for row in self.rows]
+        ids = {name: {} for name in INDEXED_FIELDS.values()}
+        schedule_ids = [[] for _ in range(14)]
+        keys = {}  # Os mesmos valores se repetem muito (estações, linhas, cozinhas)
+        for i, row in enumerate(self.rows):
+            for field, name in INDEXED_FIELDS.items():
+                value = row.get(field) or ""
+                key = keys.get(value) or keys.setdefault(value, normalize_key(value))
+                if key and key != "n a":
+                    ids[name].setdefault(key, []).append(i)
+            for position in range(14):
+                if self.masks[i] >> position & 1:
+                    schedule_ids[position].append(i)
+
+        size = len(self.rows)
+        self.postings = {name: {key: to_bitset(found, size) for key, found in values.items()}
+                         for name, values in ids.items()}
+        self.schedule = [to_bitset(found, size) for found in schedule_ids]
+        self.everything = (1 << size) - 1
+
+    @classmethod
+    def from_csv(cls, *paths):
+        return cls(read_rows(paths))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def match(self, name, value):
+        """Restaurantes cujo campo bate com o valor (sem acento nem caixa; parcial para linha e cozinha)"""
+        key = normalize_key(value) or ""
+        postings = self.postings[name]
+        if name not in PARTIAL_FILTERS:
+            return postings.get(key, 0)
+        words = set(key.split())
+        bits = 0
+        for candidate, candidate_bits in postings.items():
+            if words <= set(candidate.split()):
+                bits |= candidate_bits
+        return bits
+
+    def query(self, day=None, meal=None, line=None, station=None, cuisine=None, city=None,
+              max_time=None, limit=None):
+        """Restaurantes que atendem a todos os filtros, do menor para o maior tempo a pé
+
+        day é uma das abreviações de DAYS ("dom" ... "sab") e meal "almoco" ou "jantar";
+        sem um deles, vale qualquer dia ou qualquer refeição. max_time é em minutos.
+        """
+        bits = self.everything
+        if day or meal:
+            available = 0
+            for position in schedule_bits(day, meal):
+                available |= self.schedule[position]
+            bits &= available
+        for name, value in (("line", line), ("station", station), ("cuisine", cuisine), ("city", city)):
+            if value:
+                bits &= self.match(name, value)
+
+        results = []
+        for i in iter_bits(bits, len(self.rows)):
+            if max_time is not None and self.times[i] > max_time:
+                break
+            results.append(self.rows[i])
+            if limit and len(results) >= limit:
+                break
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Busca restaurantes por dia, refeição, linha, estação e cozinha")
+    parser.add_argument("--csv", nargs="+", default=[DEFAULT_CSV], help="CSVs gerados (um por cidade ou o juntado)")
+    parser.add_argument("--dia", choices=DAYS)
+    parser.add_argument("--refeicao", choices=MEALS)
+    parser.add_argument("--linha", help='Número ou cor da linha, ex: "2" ou "verde"')
+    parser.add_argument("--estacao")
+    parser.add_argument("--cozinha")
+    parser.add_argument("--cidade", help="Para o CSV juntado pelo cities.py")
+    parser.add_argument("--tempo-max", type=float, help="Tempo máximo a pé, em minutos")
+    parser.add_argument("--limite", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = RestaurantIndex.from_csv(*args.csv)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    results = index.query(day=args.dia, meal=args.refeicao, line=args.linha, station=args.estacao,
+                          cuisine=args.cozinha, city=args.cidade, max_time=args.tempo_max, limit=args.limite)
+    elapsed = time.perf_counter() - start
+
+    for row in results:
+        print(f"🍽️ {row['nome']} ({row.get('cozinha', '')}) - {row.get('Estacao', 'N/A')} "
+              f"[{row.get('Linha', 'N/A')}], {row.get('Tempo', 'N/A')} min a pé")
+    print(f"\n🔎 {len(results)} restaurantes (de {len(index)}) em {elapsed * 1000:.2f} ms; "
+          f"índice montado em {built * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import struct
+
+import numpy as np
+
+import distance_matrix
+from station_index import haversine_distance
+
+MAGIC = b"SGRD"
+VERSION = 2
+# magic, versão, sha256 do CSV de estações, lat0, lon0, tamanho da célula (graus), linhas, colunas, slots,
+# bytes por índice de estação
+HEADER = struct.Struct("<4sH32sdddIIHH")
+HEADER_SIZE = 128  # Cabeçalho com folga; a matriz de células começa alinhada logo depois
+INDEX_TYPES = {2: np.uint16, 4: np.uint32}
+
+
+def file_hash(path):
+    """sha256 do arquivo de estações, gravado na grade para saber quando reconstruí-la"""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+def markers(dtype):
+    """(EMPTY, OVERFLOW) do tipo de índice: slot sem estação e célula com candidatas demais
+
+    Na célula OVERFLOW a busca cai no índice espacial.
+    """
+    top = int(np.iinfo(dtype).max)
+    return top, top - 1
+
+
+def index_type(station_count):
+    """Menor tipo de índice que guarda todas as estações além dos dois marcadores"""
+    for dtype in INDEX_TYPES.values():
+        if station_count < markers(dtype)[1]:
+            return dtype
+    raise ValueError(f"Estações demais para a grade: {station_count}")
+
+
+def half_diagonal(center_lat, cell_deg):
+    """Maior distância (metros) entre o centro de uma célula e seus cantos"""
+    half = cell_deg / 2
+    return max(haversine_distance(center_lat, 0.0, center_lat + sign * half, half) for sign in (-1, 1))
+
+
+def build_grid(stations, path, source_hash, cell_deg=0.005, padding=0.05, slots=8):
+    """Pré-calcula as estações candidatas de cada célula da grade e grava o arquivo binário
+
+    A grade cobre a caixa das estações com padding graus de folga. Para o centro c de cada
+    célula, com meia diagonal h, a estação mais próxima de qualquer ponto da célula está a
+    no máximo d(c, mais próxima de c) + 2h de c; todas as estações dentro desse raio são
+    gravadas (ordenadas pela distância ao centro), ou a célula é marcada como OVERFLOW se
+    não couberem em slots. Os índices ficam em uint16 enquanto couberem (até 65533 estações)
+    e em uint32 acima disso; a largura vai no cabeçalho.
+    """
+    lats = stations.lats
+    lons = stations.lons
+    lat0, lon0 = min(lats) - padding, min(lons) - padding
+    rows = int(np.ceil((max(lats) + padding - lat0) / cell_deg))
+    cols = int(np.ceil((max(lons) + padding - lon0) / cell_deg))
+
+    center_lats = lat0 + (np.arange(rows) + 0.5) * cell_deg
+    center_lons = lon0 + (np.arange(cols) + 0.5) * cell_deg
+    limits = np.array([2 * half_diagonal(lat, cell_deg) + 1.0 for lat in center_lats])
+
+    dtype = index_type(len(stations))
+    empty, overflow_marker = markers(dtype)
+    width = min(slots, len(stations))
+    cells = np.full((rows, cols, slots), empty, dtype=dtype)
+    for row in range(rows):
+        distances = distance_matrix.distance_matrix(
+            np.full(cols, center_lats[row]), center_lons, lats, lons
+        )
+        order = np.argsort(distances, axis=1)[:, :width]
+        ordered = np.take_along_axis(distances, order, axis=1)
+        radius = ordered[:, :1] + limits[row]
+        cells[row, :, :width] = np.where(ordered <= radius, order, empty)
+        overflow = (distances <= radius).sum(axis=1) > slots
+        cells[row, overflow, 0] = overflow_marker
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, source_hash, lat0, lon0, cell_deg, rows, cols, slots,
+                            np.dtype(dtype).itemsize).ljust(HEADER_SIZE, b"\0"))
+        f.write(cells.tobytes())
+    os.replace(temp_path, path)
+
+
+class StationGrid:
+    """Grade pré-calculada (arquivo mapeado em memória) de estações candidatas por célula
+
+    A consulta é só achar a célula e medir a distância exata até as poucas candidatas dela.
+    """
+
+    def __init__(self, path, stations):
+        self.stations = stations  # StationTable
+        with open(path, "rb") as f:
+            header = HEADER.unpack(f.read(HEADER.size))
+        _, _, self.source_hash, self.lat0, self.lon0, self.cell_deg, rows, cols, slots, index_size = header
+        dtype = INDEX_TYPES[index_size]
+        self.empty, self.overflow = markers(dtype)
+        self.cells = np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(rows, cols, slots))
+
+    @classmethod
+    def open(cls, path, stations, source_hash):
+        """Abre a grade se ela existir e tiver sido montada a partir do mesmo arquivo de estações"""
+        try:
+            with open(path, "rb") as f:
+                magic, version, saved_hash = HEADER.unpack(f.read(HEADER.size))[:3]
+        except (OSError, struct.error):
+            return None
+        if magic != MAGIC or version != VERSION or saved_hash != source_hash:
+            return None
+        return cls(path, stations)
+
+    @classmethod
+    def load_or_build(cls, path, stations, stations_csv, **options):
+        """Abre a grade, reconstruindo-a antes se o CSV de estações mudou (ou se ela não existe)"""
+        source_hash = file_hash(stations_csv)
+        grid = cls.open(path, stations, source_hash)
+        if grid is None:
+            build_grid(stations, path, source_hash, **options)
+            grid = cls(path, stations)
+        return grid
+
+    def candidates(self, lat, lon):
+        """Índices das estações candidatas da célula do ponto, ou None (fora da grade ou OVERFLOW)"""
+        row = int((lat - self.lat0) // self.cell_deg)
+        col = int((lon - self.lon0) // self.cell_deg)
+        rows, cols, _ = self.cells.shape
+        if not (0 <= row < rows and 0 <= col < cols):
+            return None
+        cell = self.cells[row, col].tolist()
+        if cell[0] == self.overflow:
+            return None
+        return [i for i in cell if i != self.empty]
+
+    def nearest(self, lat, lon):
+        """(distância, estação) mais próxima, ou None quando a grade não cobre o ponto"""
+        candidates = self.candidates(lat, lon)
+        if not candidates:
+            return None
+        distance, i = self.stations.nearest_of(candidates, lat, lon)
+        return distance, self.stations[i]
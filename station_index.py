@@ -0,0 +1,109 @@
+from math import radians, sin, cos, sqrt, atan2
+
+EARTH_RADIUS = 6371000.0  # Raio da Terra em metros
+# Fator de segurança entre a distância projetada e a de Haversine (erro da projeção local)
+PROJECTION_TOLERANCE = 0.98
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Calcula distância em metros entre coordenadas usando fórmula de Haversine"""
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    return EARTH_RADIUS * 2 * atan2(sqrt(a), sqrt(1-a))
+
+
+class StationIndex:
+    """Índice espacial em grade sobre as estações, com refinamento exato por Haversine
+
+    As coordenadas são projetadas (equiretangular, centrada nas estações) em metros e
+    distribuídas em células quadradas. As buscas varrem anéis de células a partir da
+    célula do ponto consultado e param assim que nenhuma estação fora dos anéis já
+    visitados pode ser mais próxima que as encontradas.
+
+    stations é uma StationTable (station_table.py), que já traz as coordenadas em radianos.
+    """
+
+    def __init__(self, stations, cell_size=1000):
+        self.stations = stations
+        self.cell_size = cell_size
+        self.cells = {}
+        if not stations:
+            return
+
+        lat0 = sum(s["lat"] for s in stations) / len(stations)
+        self.meters_per_lat = radians(1) * EARTH_RADIUS
+        self.meters_per_lon = self.meters_per_lat * cos(radians(lat0))
+        for i, station in enumerate(stations):
+            self.cells.setdefault(self.cell_of(station["lat"], station["lon"]), []).append(i)
+
+        xs = [x for x, _ in self.cells]
+        ys = [y for _, y in self.cells]
+        self.bounds = (min(xs), min(ys), max(xs), max(ys))
+
+    def cell_of(self, lat, lon):
+        """Retorna a célula da grade que contém a coordenada"""
+        return (int(lon * self.meters_per_lon // self.cell_size),
+                int(lat * self.meters_per_lat // self.cell_size))
+
+    def max_ring(self, cell):
+        """Número de anéis necessário para cobrir todas as células ocupadas a partir de cell"""
+        min_x, min_y, max_x, max_y = self.bounds
+        x, y = cell
+        return max(abs(x - min_x), abs(x - max_x), abs(y - min_y), abs(y - max_y))
+
+    def ring(self, cell, r):
+        """Gera os índices das estações nas células a exatamente r anéis de distância"""
+        x, y = cell
+        if r == 0:
+            yield from self.cells.get(cell, ())
+            return
+        # Percorre só o perímetro do quadrado de lado 2r+1
+        for d in range(-r, r + 1):
+            yield from self.cells.get((x + d, y - r), ())
+            yield from self.cells.get((x + d, y + r), ())
+        for d in range(-r + 1, r):
+            yield from self.cells.get((x - r, y + d), ())
+            yield from self.cells.get((x + r, y + d), ())
+
+    def search(self, lat, lon, k=None, radius=None):
+        """Busca as k estações mais próximas e/ou todas dentro do raio (em metros)
+
+        Retorna uma lista de (distância, estação) ordenada pela distância de Haversine.
+        """
+        if not self.stations or (k is not None and k <= 0):
+            return []
+
+        lat_rad, lon_rad = radians(lat), radians(lon)
+        cos_lat = cos(lat_rad)
+        cell = self.cell_of(lat, lon)
+        last_ring = self.max_ring(cell)
+        found = []
+        for r in range(last_ring + 1):
+            for i in self.ring(cell, r):
+                distance = self.stations.distance(i, lat_rad, lon_rad, cos_lat)
+                if radius is None or distance <= radius:
+                    found.append((distance, i))
+
+            # Qualquer estação ainda não visitada está a pelo menos r células de distância
+            unexplored = r * self.cell_size * PROJECTION_TOLERANCE
+            if radius is not None and unexplored > radius:
+                break
+            if k is not None and len(found) >= k:
+                found.sort()
+                if found[k - 1][0] <= unexplored:
+                    break
+
+        found.sort()
+        if k is not None:
+            found = found[:k]
+        return [(distance, self.stations[i]) for distance, i in found]
+
+    def nearest(self, lat, lon, k=1, max_distance=None):
+        """Retorna as k estações mais próximas, opcionalmente limitadas a max_distance metros"""
+        return self.search(lat, lon, k=k, radius=max_distance)
+
+    def within(self, lat, lon, radius):
+        """Retorna todas as estações a até radius metros"""
+        return self.search(lat, lon, radius=radius)
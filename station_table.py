@@ -0,0 +1,99 @@
+import csv
+import os
+import pickle
+from array import array
+from math import asin, cos, radians, sin, sqrt
+
+from station_index import EARTH_RADIUS
+
+SNAPSHOT_VERSION = 1
+
+
+def read_stations_csv(path):
+    """Lê as estações de metrô do arquivo CSV: [{'linha', 'nome', 'lat', 'lon'}]"""
+    stations = []
+    try:
+        with open(path, mode='r', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            for row in reader:
+                try:
+                    stations.append({
+                        "linha": row['Linha'],
+                        "nome": row['Nome da Estacao'],
+                        "lat": float(row['Latitude']),
+                        "lon": float(row['Longitude'])
+                    })
+                except (ValueError, KeyError) as e:
+                    print(f"⚠️ Erro ao processar estação {row.get('Nome da Estacao', 'N/A')}: {e}")
+    except FileNotFoundError:
+        print(f"❌ Arquivo {path} não encontrado.")
+
+    return stations
+
+
+class StationTable:
+    """Estações em colunas paralelas, com latitude/longitude já em radianos e cos(lat) pré-calculado
+
+    Continua se comportando como a lista de dicionários de antes (len, índice, iteração),
+    mas o cálculo de distância lê direto dos arrays, sem consultar dicionários nem converter
+    o lado da estação para radianos a cada chamada.
+    """
+
+    __slots__ = ("records", "linhas", "nomes", "lats", "lons", "lat_rads", "lon_rads", "cos_lats")
+
+    def __init__(self, stations):
+        self.records = list(stations)  # Dicionários usados para montar os resultados
+        self.linhas = [s["linha"] for s in self.records]
+        self.nomes = [s["nome"] for s in self.records]
+        self.lats = array("d", (s["lat"] for s in self.records))
+        self.lons = array("d", (s["lon"] for s in self.records))
+        self.lat_rads = array("d", map(radians, self.lats))
+        self.lon_rads = array("d", map(radians, self.lons))
+        self.cos_lats = array("d", map(cos, self.lat_rads))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, i):
+        return self.records[i]
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def distance(self, i, lat_rad, lon_rad, cos_lat):
+        """Haversine em metros até a estação i, com o ponto já em radianos (e seu cos(lat))"""
+        dlat = self.lat_rads[i] - lat_rad
+        dlon = self.lon_rads[i] - lon_rad
+        a = sin(dlat / 2) ** 2 + cos_lat * self.cos_lats[i] * sin(dlon / 2) ** 2
+        return 2 * EARTH_RADIUS * asin(sqrt(min(a, 1.0)))
+
+    def nearest_of(self, indexes, lat, lon):
+        """(distância, índice) da estação mais próxima entre indexes, ou None se vazio"""
+        lat_rad = radians(lat)
+        lon_rad = radians(lon)
+        cos_lat = cos(lat_rad)
+        best = None
+        for i in indexes:
+            distance = self.distance(i, lat_rad, lon_rad, cos_lat)
+            if best is None or distance < best[0]:
+                best = (distance, i)
+        return best
+
+    def save_snapshot(self, path, source_hash):
+        """Grava a tabela (pickle) para outros processos não precisarem ler o CSV de novo"""
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump((SNAPSHOT_VERSION, source_hash, self), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load_snapshot(cls, path, source_hash):
+        """Carrega a tabela gravada, se ela veio do mesmo arquivo de estações (senão None)"""
+        try:
+            with open(path, "rb") as f:
+                version, saved_hash, table = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError):
+            return None
+        if version != SNAPSHOT_VERSION or saved_hash != source_hash or not isinstance(table, cls):
+            return None
+        return table
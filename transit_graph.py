@@ -0,0 +1,187 @@
+"""Grafo do metrô montado a partir do estacoes.csv: "o que dá pra alcançar em 30 min saindo da Paulista"
+
+Cada estação é um nó, e estações seguidas da mesma linha (na ordem do CSV) são ligadas
+pelo tempo de viagem entre elas. Estações de linhas diferentes a até TRANSFER_RADIUS metros
+viram baldeações (tempo fixo mais a caminhada). O estacoes.csv lista cada estação numa linha
+só (Paraíso só na Azul, Sé só na Azul...), então TRANSFERS liga cada uma delas à vizinha na
+outra linha, como uma baldeação seguida de um trecho de trem. Um Dijkstra a partir das
+estações de origem dá o tempo até cada estação, e o tempo a pé do CSV (Tempo) completa o
+trajeto até cada restaurante. Os tempos por origem ficam em cache, então consultas seguidas
+a partir da mesma estação não refazem os caminhos.
+
+Uso: python transit_graph.py Paulista --tempo-max 30 [--dia ter --refeicao almoco] [--csv arquivo.csv ...]
+"""
+import argparse
+import heapq
+import math
+import os
+import time
+from functools import lru_cache
+
+from address import normalize_key
+from query_index import DEFAULT_CSV, MEALS, RestaurantIndex
+from output_writers import DAYS, parse_number
+from station_index import haversine_distance
+from station_table import read_stations_csv
+
+INTERSTATION_MINUTES = float(os.getenv("INTERSTATION_MINUTES", 0))  # Tempo fixo entre estações vizinhas (0 = pela distância)
+TRANSIT_SPEED_KMH = float(os.getenv("TRANSIT_SPEED_KMH", 32))  # Velocidade média do trem entre estações
+TRANSIT_DWELL_MINUTES = float(os.getenv("TRANSIT_DWELL_MINUTES", 0.5))  # Parada em cada estação
+TRANSFER_MINUTES = float(os.getenv("TRANSFER_MINUTES", 4))  # Baldeação: troca de plataforma e espera
+TRANSFER_RADIUS = float(os.getenv("TRANSFER_RADIUS", 800))  # Distância máxima em metros para baldear a pé
+TRANSFER_WALK_SPEED = 80  # Metros por minuto na caminhada da baldeação
+# Estação de integração:vizinha dela na outra linha, separadas por vírgula
+DEFAULT_TRANSFERS = ("Paraiso:Brigadeiro,Ana Rosa:Chacara Klabin,Santa Cruz:Hospital Sao Paulo,"
+                     "Se:Pedro II,Luz:Republica,Republica:Higienopolis-Mackenzie,Vila Prudente:Oratorio")
+TRANSFERS = [tuple(pair.split(":", 1)) for pair in os.getenv("TRANSFERS", DEFAULT_TRANSFERS).split(",") if ":" in pair]
+ORIGIN_CACHE_SIZE = int(os.getenv("ORIGIN_CACHE_SIZE", 64))  # Origens com tempos guardados
+DEFAULT_STATIONS_CSV = "estacoes.csv"
+
+
+class TransitGraph:
+    """Grafo de estações (lista de adjacência) com caminhos mínimos em cache por origem"""
+
+    def __init__(self, stations, interstation_minutes=INTERSTATION_MINUTES, speed_kmh=TRANSIT_SPEED_KMH,
+                 dwell_minutes=TRANSIT_DWELL_MINUTES, transfer_minutes=TRANSFER_MINUTES,
+                 transfer_radius=TRANSFER_RADIUS, transfers=TRANSFERS, cache_size=ORIGIN_CACHE_SIZE):
+        self.stations = stations
+        self.ids = {(s["linha"], s["nome"]): i for i, s in enumerate(stations)}
+        self.keys = [normalize_key(s["nome"]) or "" for s in stations]
+        self.edges = [[] for _ in stations]
+
+        def hop(a, b):
+            if interstation_minutes:
+                return interstation_minutes
+            distance = self.distance(a, b)
+            return dwell_minutes + distance / (speed_kmh * 1000 / 60)
+
+        last_on_line = {}
+        for i, station in enumerate(stations):
+            previous = last_on_line.get(station["linha"])
+            if previous is not None:
+                self.connect(previous, i, hop(previous, i))
+            last_on_line[station["linha"]] = i
+
+        for i in range(len(stations)):
+            for j in range(i + 1, len(stations)):
+                if stations[i]["linha"] != stations[j]["linha"] and self.distance(i, j) <= transfer_radius:
+                    self.connect(i, j, transfer_minutes + self.distance(i, j) / TRANSFER_WALK_SPEED)
+        for a, b in transfers:
+            for i in self.find(a):
+                for j in self.find(b):
+                    self.connect(i, j, transfer_minutes + hop(i, j))
+
+        self.shortest_paths = lru_cache(maxsize=cache_size)(self.dijkstra)
+
+    @classmethod
+    def from_csv(cls, path=DEFAULT_STATIONS_CSV, **options):
+        """Monta o grafo a partir de um arquivo de estações no formato do estacoes.csv"""
+        return cls(read_stations_csv(path), **options)
+
+    def distance(self, i, j):
+        a, b = self.stations[i], self.stations[j]
+        return haversine_distance(a["lat"], a["lon"], b["lat"], b["lon"])
+
+    def connect(self, i, j, minutes):
+        self.edges[i].append((j, minutes))
+        self.edges[j].append((i, minutes))
+
+    def find(self, name):
+        """Estações com esse nome (sem acento nem caixa); sem nome exato, as que contêm as palavras"""
+        key = normalize_key(name) or ""
+        exact = [i for i, candidate in enumerate(self.keys) if candidate == key]
+        if exact:
+            return exact
+        words = set(key.split())
+        return [i for i, candidate in enumerate(self.keys) if words and words <= set(candidate.split())]
+
+    def dijkstra(self, sources):
+        """Minutos até cada estação partindo de qualquer uma das fontes (inf se inalcançável)"""
+        minutes = [math.inf] * len(self.stations)
+        heap = [(0.0, source) for source in sources]
+        for source in sources:
+            minutes[source] = 0.0
+        while heap:
+            elapsed, i = heapq.heappop(heap)
+            if elapsed > minutes[i]:
+                continue
+            for j, cost in self.edges[i]:
+                total = elapsed + cost
+                if total < minutes[j]:
+                    minutes[j] = total
+                    heapq.heappush(heap, (total, j))
+        return tuple(minutes)
+
+    def travel_times(self, origin):
+        """{(linha, estação): minutos} a partir da estação de origem, ou None se ela não existir"""
+        sources = tuple(self.find(origin))
+        if not sources:
+            return None
+        minutes = self.shortest_paths(sources)
+        return {node: minutes[i] for node, i in self.ids.items()}
+
+    def rank(self, rows, origin, max_minutes=None):
+        """Restaurantes ordenados pelo tempo total (metrô + caminhada): [(total, metrô, row)]
+
+        Restaurantes sem estação a distância de caminhada (Tempo "N/A") ficam de fora.
+        """
+        times = self.travel_times(origin)
+        if times is None:
+            return None
+        ranked = []
+        for row in rows:
+            transit = times.get((row.get("Linha"), row.get("Estacao")), math.inf)
+            walk = parse_number(row.get("Tempo"))
+            if walk is None or transit == math.inf:
+                continue
+            total = transit + walk
+            if max_minutes is None or total <= max_minutes:
+                ranked.append((total, transit, row))
+        ranked.sort(key=lambda item: item[0])
+        return ranked
+
+
+def print_ranking(graph, index, args, origin):
+    start = time.perf_counter()
+    rows = index.query(day=args.dia, meal=args.refeicao, cuisine=args.cozinha)
+    ranked = graph.rank(rows, origin, args.tempo_max)
+    elapsed = time.perf_counter() - start
+    if ranked is None:
+        print(f"⚠️ Estação não encontrada: {origin}")
+        return
+    for total, transit, row in ranked[:args.limite]:
+        print(f"🚇 {total:5.1f} min  {row['nome']} ({row.get('cozinha', '')}) - {row['Estacao']} "
+              f"[{row['Linha']}], {transit:.1f} min de metrô + {row['Tempo']} min a pé")
+    print(f"\n🔎 {len(ranked)} restaurantes alcançáveis a partir de {origin} em {elapsed * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ordena os restaurantes pelo tempo total de metrô + caminhada")
+    parser.add_argument("origem", nargs="?", help="Estação de partida (sem ela, pergunta no terminal)")
+    parser.add_argument("--csv", nargs="+", default=[DEFAULT_CSV])
+    parser.add_argument("--estacoes", default=DEFAULT_STATIONS_CSV)
+    parser.add_argument("--tempo-max", type=float, help="Tempo total máximo, em minutos")
+    parser.add_argument("--dia", choices=DAYS)
+    parser.add_argument("--refeicao", choices=MEALS)
+    parser.add_argument("--cozinha")
+    parser.add_argument("--limite", type=int, default=20)
+    args = parser.parse_args()
+
+    graph = TransitGraph.from_csv(args.estacoes)
+    index = RestaurantIndex.from_csv(*args.csv)
+    if args.origem:
+        print_ranking(graph, index, args, args.origem)
+        return
+    # Modo interativo: os caminhos de cada origem são calculados uma vez só
+    try:
+        while True:
+            origin = input("\nEstação de origem (Enter para sair): ").strip()
+            if not origin:
+                break
+            print_ranking(graph, index, args, origin)
+    except (EOFError, KeyboardInterrupt):
+        pass
+
+
+if __name__ == "__main__":
+    main()
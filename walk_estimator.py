@@ -0,0 +1,101 @@
+"""Estimativa local da distância e do tempo a pé até a estação, sem chamar a Routes API
+
+O modelo é aprendido com as rotas da Google já gravadas no CSV: o fator de desvio
+(distância a pé / distância em linha reta) e o ritmo (minutos por metro) de cada estação,
+ou de todas juntas quando a estação tem poucas amostras. A confiança é medida por faixa
+de distância em linha reta, já que caminhadas curtas desviam bem mais que as longas.
+"""
+import bisect
+import statistics
+import threading
+
+from output_writers import parse_number
+
+MAX_DETOUR = 3.0  # Fatores acima disso são tratados como outliers (rota bizarra ou estação errada)
+DISTANCE_BANDS = (300, 600, 1000, 1500)  # Limites (metros em linha reta) das faixas de confiança
+
+
+class WalkEstimator:
+    """Fator de desvio e ritmo de caminhada por estação, com um modelo geral de reserva
+
+    A confiança de um modelo numa faixa de distância é a fração das amostras da faixa cujo
+    fator de desvio fica a até tolerance da mediana, ou seja, a chance empírica de a
+    estimativa errar menos que isso. Faixas com menos de min_samples amostras não têm
+    confiança: a estação cai no modelo geral e, se ele também não tiver, vai para a Google.
+    """
+
+    def __init__(self, tolerance=0.15, min_samples=10):
+        self.tolerance = tolerance
+        self.min_samples = min_samples
+        self.samples = {}  # estação -> [(metros em linha reta, fator de desvio, minutos por metro)]
+        self.models = {}
+        self.general = None
+        self.lock = threading.Lock()
+        self.stats = {"estimated": 0, "routed": 0}
+
+    def add(self, station, straight, walking, minutes):
+        """Acrescenta uma rota conhecida (metros em linha reta, metros a pé, minutos)"""
+        if not straight or not walking or straight <= 0 or walking <= 0 or minutes is None:
+            return
+        detour = walking / straight
+        if not 1.0 <= detour <= MAX_DETOUR:
+            return
+        self.samples.setdefault(station, []).append((straight, detour, minutes / walking))
+
+    def add_rows(self, rows):
+        """Acrescenta as rotas calculadas pela Google em linhas do CSV (ignora as estimadas)"""
+        for row in rows:
+            if row.get("Fonte", "google") not in ("", "google") or row.get("Estacao", "N/A") == "N/A":
+                continue
+            self.add(row["Estacao"], parse_number(row.get("Distancia_reta")),
+                     parse_number(row.get("Distancia")), parse_number(row.get("Tempo")))
+
+    def build_model(self, samples):
+        median = statistics.median(detour for _, detour, _ in samples)
+        bands = [[] for _ in range(len(DISTANCE_BANDS) + 1)]
+        for straight, detour, _ in samples:
+            bands[bisect.bisect_right(DISTANCE_BANDS, straight)].append(abs(detour / median - 1) <= self.tolerance)
+        return {
+            "detour": median,
+            "pace": statistics.median(pace for _, _, pace in samples),
+            # Confiança por faixa de distância (None onde faltam amostras)
+            "confidence": [sum(band) / len(band) if len(band) >= self.min_samples else None for band in bands],
+            "samples": len(samples),
+        }
+
+    def fit(self):
+        """Calcula os modelos por estação e o geral a partir das amostras"""
+        everything = [sample for samples in self.samples.values() for sample in samples]
+        self.models = {
+            station: self.build_model(samples)
+            for station, samples in self.samples.items()
+            if len(samples) >= self.min_samples
+        }
+        self.general = self.build_model(everything) if len(everything) >= self.min_samples else None
+        return self
+
+    def estimate(self, station, straight):
+        """Estimativa {'distance', 'duration', 'confidence'} para a estação, ou None sem modelo
+
+        Usa o modelo da estação se ele tiver amostras na faixa de distância, senão o geral.
+        """
+        band = bisect.bisect_right(DISTANCE_BANDS, straight)
+        for model in (self.models.get(station), self.general):
+            if model is None or model["confidence"][band] is None:
+                continue
+            distance = straight * model["detour"]
+            return {"distance": distance, "duration": distance * model["pace"],
+                    "confidence": model["confidence"][band]}
+        return None
+
+    def record(self, estimated):
+        """Conta um restaurante resolvido localmente (True) ou mandado para a Google (False)"""
+        with self.lock:
+            self.stats["estimated" if estimated else "routed"] += 1
+
+    def summary(self):
+        """Resumo legível de quantas rotas foram estimadas na execução atual"""
+        total = self.stats["estimated"] + self.stats["routed"]
+        rate = self.stats["estimated"] / total * 100 if total else 0
+        return (f"{self.stats['estimated']}/{total} rotas estimadas localmente ({rate:.0f}%), "
+                f"{len(self.models)} estações com modelo próprio")